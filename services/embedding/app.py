@@ -1,15 +1,23 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Union
 from utils.schema_ import (
-    EmbedRequest, SearchRequest, DeleteRequest, 
-    DocumentUploadResponse, DocumentListResponse, ChunkInfo
+    EmbedRequest, SearchRequest, SearchBatchRequest, DeleteRequest, 
+    DocumentUploadResponse, DocumentListResponse, ChunkInfo, JobStatusResponse, BulkUploadResponse
 )
 import chromadb
 from chromadb.config import Settings
-from vectordb.chroma_store import ChromaStore
-from services.document_service import DocumentService
+from vectordb.chroma_store import ChromaStore, build_where
+from models.registry import model_registry
+from services.document_service import DocumentService, prepare_artifacts
+from services.job_service import JobService
+from utils.upload_spool import spool_upload
+from utils.artifact_cache import chunker_key
+import config
+import json
 import time
+from datetime import datetime
 
 app = FastAPI(title="AI Classroom Embedding Service", version="1.0.0")
 
@@ -25,29 +33,106 @@ app.add_middleware(
 # Initialize services with persistent storage
 chroma_store = ChromaStore()
 document_service = DocumentService(chroma_store)
+job_service = JobService(document_service)
 
 # Use the same collection for consistency
 collection = chroma_store.collection
 
+@app.on_event("startup")
+async def start_jobs():
+    await job_service.start()
+
+@app.on_event("shutdown")
+async def shutdown_executor():
+    await job_service.shutdown()
+    document_service.executor.shutdown()
+    chroma_store.lexical_index.save()
+
 @app.get("/")
 def index():
     return {"status": "ChromaDB context engine is live."}
 
+GET_ALL_FIELDS = {"id", "text", "metadata"}
+
+def _get_all_page(offset: int, limit: int, fields: set) -> list:
+    """Fetch one page of the collection, projected to the requested fields."""
+    include = []
+    if "text" in fields:
+        include.append("documents")
+    if "metadata" in fields:
+        include.append("metadatas")
+    results = chroma_store.collection.get(limit=limit, offset=offset, include=include)
+    ids = results.get("ids") or []
+    documents = results.get("documents") or [None] * len(ids)
+    metadatas = results.get("metadatas") or [None] * len(ids)
+
+    page = []
+    for id_, doc, meta in zip(ids, documents, metadatas):
+        item = {}
+        if "id" in fields:
+            item["id"] = id_
+        if "text" in fields:
+            item["text"] = doc
+        if "metadata" in fields:
+            item["metadata"] = meta
+        page.append(item)
+    return page
+
 @app.get("/get-all")
-def get_all_documents():
+def get_all_documents(
+    limit: int = Query(1000, ge=1, le=10000),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    fields: str = "id,text,metadata"
+):
+    """
+    Page through the collection.
+
+    Returns at most `limit` items starting at `cursor` together with the
+    cursor of the next page. With `stream=true` the whole collection (from
+    `cursor` on) is streamed as NDJSON, fetched `limit` items at a time.
+    `fields` selects which of id, text and metadata are returned. The
+    cursor is an offset, so writes between pages can skip or repeat items.
+    A stream that fails part way ends with an `error` line.
+    """
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    if not requested or not requested <= GET_ALL_FIELDS:
+        raise HTTPException(status_code=400, detail=f"Invalid fields. Choose from: {sorted(GET_ALL_FIELDS)}")
     try:
-        # Use chroma_store collection for consistency
-        results = chroma_store.collection.get()
-        documents = results.get("documents", [])
-        metadatas = results.get("metadatas", [])
-        ids = results.get("ids", [])
+        offset = int(cursor) if cursor else 0
+        if offset < 0:
+            raise ValueError
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if stream:
+        def generate():
+            position = offset
+            while True:
+                try:
+                    page = _get_all_page(position, limit, requested)
+                except Exception as e:
+                    # The status line has already been sent; tell the client where to resume
+                    print(f"❌ Error streaming the collection at offset {position}: {e}")
+                    yield json.dumps({"error": "Error reading the collection", "next_cursor": str(position)}) + "\n"
+                    return
+                for item in page:
+                    yield json.dumps(item) + "\n"
+                if len(page) < limit:
+                    break
+                position += len(page)
 
-        formatted = [
-            {"id": id_, "text": doc, "metadata": meta}
-            for id_, doc, meta in zip(ids, documents, metadatas)
-        ]
+        return StreamingResponse(generate(), media_type="application/x-ndjson")
 
-        return {"count": len(formatted), "data": formatted}
+    try:
+        page = _get_all_page(offset, limit, requested)
+        next_cursor = str(offset + len(page)) if len(page) == limit else None
+        return {
+            "count": len(page),
+            "total": chroma_store.collection.count(),
+            "next_cursor": next_cursor,
+            "data": page
+        }
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -61,73 +146,123 @@ def embed_text(req: EmbedRequest):
         else [req.metadata] * len(texts) if req.metadata else [{} for _ in texts]
     )
     
+    if req.ids is not None and len(req.ids) != len(texts):
+        raise HTTPException(status_code=400, detail="ids must have one entry per content item")
+    
     # Use chroma_store for consistent embedding model
-    ids = chroma_store.add_texts(texts, metadatas)
+    ids = chroma_store.add_texts(texts, metadatas, ids=req.ids)
     return {"message": f"{len(ids)} item(s) embedded successfully.", "ids": ids, "success": True}
 
+def format_search_results(results: dict, position: int = 0) -> list:
+    """Flatten one query's results from a Chroma query response."""
+    documents = results.get("documents", [[]])[position]
+    metadatas = results.get("metadatas", [[]])[position]
+    distances = results.get("distances", [[]])[position]
+    ids = results.get("ids", [[]])[position]
+    formatted = [
+        {
+            "id": chunk_id,
+            "text": doc, 
+            "metadata": meta, 
+            "distance": dist,
+            "document_id": meta.get("document_id") if meta else None,
+            "document_name": meta.get("document_name") if meta else None,
+            "chunk_index": meta.get("chunk_index") if meta else None
+        }
+        for chunk_id, doc, meta, dist in zip(ids, documents, metadatas, distances)
+    ]
+    # Fused rank score for lexical and hybrid searches
+    if results.get("scores"):
+        for result, score in zip(formatted, results["scores"][position]):
+            result["score"] = score
+    return formatted
+
+def search_filter(req: SearchRequest):
+    """Translate the filter fields of a search request into a Chroma `where` clause."""
+    document_ids = list(req.document_ids or [])
+    if req.document_id and req.document_id not in document_ids:
+        document_ids.append(req.document_id)
+    return build_where(
+        document_ids=document_ids,
+        file_types=req.file_types,
+        upload_date_from=req.upload_date_from,
+        upload_date_to=req.upload_date_to
+    )
+
 @app.post("/search")
 def search_text(req: SearchRequest):
     try:
-        # Use chroma_store for consistent embedding model
-        results = chroma_store.search(req.query, req.k)
-        
-        # Handle results from chroma_store
-        documents = results.get("documents", [[]])[0]
-        metadatas = results.get("metadatas", [[]])[0]
-        distances = results.get("distances", [[]])[0]
-        ids = results.get("ids", [[]])[0]
-        
-        # Filter by document_id if specified
-        if req.document_id:
-            filtered_results = []
-            for i, (doc, meta, dist, chunk_id) in enumerate(zip(documents, metadatas, distances, ids)):
-                if meta.get("document_id") == req.document_id:
-                    filtered_results.append({
-                        "id": chunk_id,
-                        "text": doc, 
-                        "metadata": meta, 
-                        "distance": dist,
-                        "document_id": meta.get("document_id"),
-                        "document_name": meta.get("document_name"),
-                        "chunk_index": meta.get("chunk_index")
-                    })
-            return {
-                "results": filtered_results,
-                "query": req.query,
-                "total_results": len(filtered_results),
-                "document_filter": req.document_id
-            }
+        # Filters are pushed down into the vector query
+        if req.mode == "vector":
+            results = chroma_store.search(req.query, req.k, where=search_filter(req))
         else:
-            return {
-                "results": [
-                    {
-                        "id": chunk_id,
-                        "text": doc, 
-                        "metadata": meta, 
-                        "distance": dist,
-                        "document_id": meta.get("document_id") if meta else None,
-                        "document_name": meta.get("document_name") if meta else None,
-                        "chunk_index": meta.get("chunk_index") if meta else None
-                    }
-                    for chunk_id, doc, meta, dist in zip(ids, documents, metadatas, distances)
-                ],
-                "query": req.query,
-                "total_results": len(documents),
-                "document_filter": req.document_id
-            }
+            results = chroma_store.hybrid_search(req.query, req.k, where=search_filter(req), mode=req.mode)
+        formatted = format_search_results(results)
+        return {
+            "results": formatted,
+            "query": req.query,
+            "total_results": len(formatted),
+            "document_filter": req.document_id
+        }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/search-batch")
+def search_batch(req: SearchBatchRequest):
+    """Run several searches with one embedding pass and grouped vector queries."""
+    try:
+        if not req.queries:
+            return {"results": [], "total_queries": 0}
+        # Vector queries share one encode; lexical and hybrid ones run individually
+        vector_items = [i for i, item in enumerate(req.queries) if item.mode == "vector"]
+        results = [None] * len(req.queries)
+        if vector_items:
+            batch_results = chroma_store.search_batch(
+                [req.queries[i].query for i in vector_items],
+                [req.queries[i].k for i in vector_items],
+                [search_filter(req.queries[i]) for i in vector_items]
+            )
+            for i, result in zip(vector_items, batch_results):
+                results[i] = result
+        for i, item in enumerate(req.queries):
+            if results[i] is None:
+                results[i] = chroma_store.hybrid_search(item.query, item.k, where=search_filter(item), mode=item.mode)
+        responses = []
+        for item, result in zip(req.queries, results):
+            formatted = format_search_results(result)
+            responses.append({
+                "results": formatted,
+                "query": item.query,
+                "total_results": len(formatted),
+                "document_filter": item.document_id
+            })
+        return {"results": responses, "total_queries": len(responses)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/ready")
+def readiness():
+    """Readiness probe: succeeds once the embedding model is loaded and warmed up."""
+    if not chroma_store.ready.is_set():
+        raise HTTPException(status_code=503, detail="Embedding model is warming up")
+    return {"status": "ready", "items": chroma_store.collection.count()}
+
+@app.get("/stats")
+def get_stats():
+    """Report cache statistics and model memory usage."""
+    return {
+        "models": model_registry.memory_usage(),
+        "query_cache": chroma_store.query_cache.stats(),
+        "embedding_cache": chroma_store.embedding_cache.stats(),
+        "artifact_cache": document_service.artifact_cache.stats()
+    }
+
 @app.delete("/delete-all")
 def delete_all_history():
     """Deletes and recreates the entire collection, clearing all data."""
     try:
         # Delete and recreate the chroma_store collection
-        chroma_store.client.delete_collection("walnut-embeddings")
-        chroma_store.collection = chroma_store.client.get_or_create_collection(
-            name="walnut-embeddings",
-            metadata={"hnsw:space": "cosine"}
-        )
+        chroma_store.reset_collection()
         return {"status": "success", "message": "Collection 'walnut-embeddings' has been cleared."}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to clear collection: {str(e)}")
@@ -136,25 +271,75 @@ def delete_all_history():
 def delete_items(req: DeleteRequest):
     """Deletes specific items from the collection by their IDs."""
     try:
-        chroma_store.collection.delete(ids=req.ids)
+        chroma_store.delete_ids(req.ids)
         return {"status": "success", "message": f"Successfully deleted {len(req.ids)} item(s)."}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Document Processing Endpoints
 
-@app.post("/upload-document", response_model=DocumentUploadResponse)
-async def upload_document(file: UploadFile = File(...)):
+@app.post("/upload-document", response_model=Union[JobStatusResponse, DocumentUploadResponse])
+async def upload_document(response: Response, file: UploadFile = File(...), wait: bool = False, force: bool = False):
+    """
+    Upload a document (PDF, DOCX, PPTX) for processing.
+    The file is queued as a background job and a 202 with the job is
+    returned right away; poll /jobs/{job_id} for progress. With wait=true
+    the document is processed within the request and the result returned.
+    A file whose content is already stored is not processed again; its
+    existing document is returned unless force=true.
+    """
+    if wait:
+        return await document_service.process_document(file, force=force)
+    job = await job_service.submit(file, force=force)
+    response.status_code = 202
+    return job.to_dict()
+
+@app.post("/upload-documents", response_model=BulkUploadResponse)
+async def upload_documents(files: List[UploadFile] = File(...), force: bool = False):
     """
-    Upload and process a document (PDF, DOCX, PPTX).
-    The document will be chunked and stored in the vector database.
+    Upload and process many documents at once; ZIP archives are unpacked.
+    Documents are extracted and chunked in parallel, their chunks embedded
+    in shared batches, and the response lists the result of every file.
+    Documents already stored are skipped unless force=true.
     """
-    return await document_service.process_document(file)
+    return await document_service.process_documents(files, force=force)
+
+@app.get("/jobs/{job_id}", response_model=JobStatusResponse)
+def get_job(job_id: str):
+    """Get the status and progress of an ingestion job."""
+    job = job_service.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request):
+    """Stream the progress of an ingestion job as server-sent events until it finishes."""
+    if job_service.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        async for event in job_service.events(job_id):
+            if await request.is_disconnected():
+                break
+            yield event
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 @app.get("/documents", response_model=DocumentListResponse)
-def get_documents():
-    """Get list of all uploaded documents."""
-    documents = document_service.get_document_list()
+def get_documents(
+    file_type: Optional[str] = None,
+    document_name: Optional[str] = None,
+    uploaded_after: Optional[datetime] = None,
+    uploaded_before: Optional[datetime] = None
+):
+    """Get list of uploaded documents, optionally filtered."""
+    documents = document_service.get_document_list(
+        file_type=file_type,
+        document_name=document_name,
+        uploaded_after=uploaded_after,
+        uploaded_before=uploaded_before
+    )
     return DocumentListResponse(
         documents=documents,
         total_count=len(documents)
@@ -173,17 +358,18 @@ def delete_document(document_id: str):
 @app.get("/documents/{document_id}/info")
 def get_document_info(document_id: str):
     """Get information about a specific document."""
-    if document_id not in document_service.documents_metadata:
+    record = document_service.document_index.get(document_id)
+    if record is None:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    metadata = document_service.documents_metadata[document_id]
+    # The content hash is internal and stays out of the response
     return {
-        "document_id": metadata["document_id"],
-        "document_name": metadata["document_name"],
-        "upload_date": metadata["upload_date"],
-        "total_chunks": metadata["total_chunks"],
-        "total_characters": metadata["total_characters"],
-        "file_type": metadata["file_type"]
+        "document_id": record.document_id,
+        "document_name": record.document_name,
+        "upload_date": record.upload_date.isoformat(),
+        "total_chunks": record.total_chunks,
+        "total_characters": record.total_characters,
+        "file_type": record.file_type
     }
 
 @app.post("/chunk-document")
@@ -191,6 +377,8 @@ async def chunk_document(file: UploadFile = File(...)):
     """
     Upload a document and return its chunks without storing in database.
     This endpoint processes the file, extracts text, chunks it, and returns the chunks.
+    The cleaned text and chunks are cached by content hash, so previewing a
+    file again, or uploading it afterwards, skips extraction and chunking.
     """
     try:
         # Validate file format
@@ -200,29 +388,37 @@ async def chunk_document(file: UploadFile = File(...)):
                 detail=f"Unsupported file format. Supported formats: {document_service.document_processor.supported_formats}"
             )
         
-        # Read file content
-        file_content = await file.read()
-        if len(file_content) == 0:
-            raise HTTPException(status_code=400, detail="Empty file")
-        
-        # Extract text with page information for PDFs
-        extracted_text, page_info = document_service.document_processor.extract_text_with_page_info(file_content, file.filename)
-        cleaned_text = document_service.document_processor.clean_text(extracted_text)
-        
-        if not cleaned_text.strip():
-            raise HTTPException(status_code=400, detail="No text content found in document")
+        # Stream the upload to disk instead of reading it into memory, hashing it on the way
+        file_path, content_hash = await spool_upload(file, document_service.max_upload_bytes, directory=config.UPLOAD_SPOOL_DIR)
         
         # Generate temporary document ID
         import uuid
         temp_document_id = str(uuid.uuid4())
         
-        # Create chunks with page information
-        chunks = document_service._create_chunks_with_page_info(
-            text=cleaned_text,
-            document_id=temp_document_id,
-            document_name=file.filename,
-            page_info=page_info
-        )
+        artifact_cache = document_service.artifact_cache
+        cache_key = chunker_key(document_service.text_chunker)
+        executor = document_service.executor
+        try:
+            artifacts = await executor.run_io(artifact_cache.get, content_hash, cache_key)
+            if artifacts is None:
+                # Extract, clean and chunk off the event loop
+                async with executor.job():
+                    artifacts = await executor.run_cpu(
+                        prepare_artifacts,
+                        document_service.document_processor,
+                        document_service.text_chunker,
+                        str(file_path),
+                        file.filename
+                    )
+                await executor.run_io(artifact_cache.put, content_hash, cache_key, artifacts)
+        finally:
+            file_path.unlink(missing_ok=True)
+        
+        total_characters = len(artifacts.text)
+        chunks = artifacts.chunks(temp_document_id, file.filename)
+        
+        if not total_characters:
+            raise HTTPException(status_code=400, detail="No text content found in document")
         
         if not chunks:
             raise HTTPException(status_code=400, detail="No valid chunks created from document")
@@ -243,7 +439,7 @@ async def chunk_document(file: UploadFile = File(...)):
             "success": True,
             "document_name": file.filename,
             "total_chunks": len(chunks),
-            "total_characters": len(cleaned_text),
+            "total_characters": total_characters,
             "file_type": file.filename.split('.')[-1].lower(),
             "chunks": chunk_responses
         }
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Benchmark the span-based TextChunker against the previous implementation
+
+Generates multi-megabyte sentence-structured text (or uses a given text
+file), chunks it with both implementations and reports throughput. It also
+checks that every new chunk's start_char/end_char slice back to its text.
+
+Usage:
+    python benchmark_chunker.py                 # 1, 4 and 8 MB of generated text
+    python benchmark_chunker.py --sizes 2 16    # custom sizes in MB
+    python benchmark_chunker.py --file notes.txt
+"""
+
+import argparse
+import random
+import re
+import time
+from typing import List
+
+from utils.text_chunker import TextChunk, TextChunker
+
+WORDS = (
+    "process thread deadlock semaphore mutex paging segmentation kernel scheduler "
+    "memory virtual page frame fork exec syscall interrupt cache disk file inode "
+    "round robin priority banker algorithm safe state critical section monitor"
+).split()
+
+class LegacyTextChunker(TextChunker):
+    """The string-concatenation chunker this service used before span-based chunking."""
+
+    def split_into_sentences(self, text: str) -> List[str]:
+        """Split text into sentences using regex."""
+        # Split on sentence endings, keeping the punctuation
+        sentences = re.split(r'(?<=[.!?])\s+', text)
+        return [s.strip() for s in sentences if s.strip()]
+    
+    def create_chunks(self, text: str, document_id: str, document_name: str, page_number: int = None) -> List[TextChunk]:
+        """
+        Create overlapping chunks from text.
+        
+        Args:
+            text: The text to chunk
+            document_id: Unique identifier for the document
+            document_name: Name of the document
+            page_number: Page number (for PDFs)
+        
+        Returns:
+            List of TextChunk objects
+        """
+        if not text.strip():
+            return []
+        
+        # Split into sentences first
+        sentences = self.split_into_sentences(text)
+        if not sentences:
+            return []
+        
+        chunks = []
+        current_chunk = ""
+        current_start = 0
+        chunk_index = 0
+        
+        for i, sentence in enumerate(sentences):
+            # Check if adding this sentence would exceed chunk size
+            if len(current_chunk) + len(sentence) + 1 > self.chunk_size and current_chunk:
+                # Create chunk from current content
+                chunk = TextChunk(
+                    text=current_chunk.strip(),
+                    chunk_index=chunk_index,
+                    total_chunks=0,  # Will be updated later
+                    document_id=document_id,
+                    document_name=document_name,
+                    start_char=current_start,
+                    end_char=current_start + len(current_chunk),
+                    page_number=page_number
+                )
+                chunks.append(chunk)
+                
+                # Start new chunk with overlap
+                overlap_text = self._get_overlap_text(current_chunk)
+                current_chunk = overlap_text + " " + sentence if overlap_text else sentence
+                current_start = current_start + len(current_chunk) - len(overlap_text) - len(sentence) - 1
+                chunk_index += 1
+            else:
+                # Add sentence to current chunk
+                if current_chunk:
+                    current_chunk += " " + sentence
+                else:
+                    current_chunk = sentence
+                    current_start = 0
+        
+        # Add the last chunk if it has content
+        if current_chunk.strip():
+            chunk = TextChunk(
+                text=current_chunk.strip(),
+                chunk_index=chunk_index,
+                total_chunks=0,  # Will be updated
+                document_id=document_id,
+                document_name=document_name,
+                start_char=current_start,
+                end_char=current_start + len(current_chunk),
+                page_number=page_number
+            )
+            chunks.append(chunk)
+        
+        # Update total_chunks for all chunks
+        total_chunks = len(chunks)
+        for chunk in chunks:
+            chunk.total_chunks = total_chunks
+        
+        return chunks
+    
+    def _get_overlap_text(self, text: str) -> str:
+        """Get the last portion of text for overlap."""
+        if len(text) <= self.overlap_size:
+            return text
+        
+        # Find the last sentence that fits in overlap size
+        sentences = self.split_into_sentences(text)
+        overlap_text = ""
+        
+        for sentence in reversed(sentences):
+            if len(overlap_text + sentence) <= self.overlap_size:
+                overlap_text = sentence + " " + overlap_text if overlap_text else sentence
+            else:
+                break
+        
+        return overlap_text.strip()
+
+def generate_text(size_mb: float, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    sentences = []
+    length = 0
+    while length < target:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 30))).capitalize() + rng.choice(".?!")
+        sentences.append(sentence)
+        length += len(sentence) + 1
+    return " ".join(sentences)
+
+def time_chunker(chunker: TextChunker, text: str, repeat: int) -> tuple[float, List[TextChunk]]:
+    best = float("inf")
+    chunks = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = chunker.create_chunks(text, "bench", "bench.txt")
+        best = min(best, time.perf_counter() - start)
+    return best, chunks
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark TextChunker implementations")
+    parser.add_argument("--sizes", nargs="+", type=float, default=[1, 4, 8], help="Generated text sizes in MB")
+    parser.add_argument("--file", help="Chunk this text file instead of generated text")
+    parser.add_argument("--chunk-size", type=int, default=800)
+    parser.add_argument("--overlap-size", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    inputs = (
+        [(args.file, open(args.file, encoding="utf-8").read())]
+        if args.file
+        else [(f"{size:g} MB generated", generate_text(size)) for size in args.sizes]
+    )
+    legacy = LegacyTextChunker(args.chunk_size, args.overlap_size)
+    current = TextChunker(args.chunk_size, args.overlap_size)
+
+    print(f"{'input':<16} {'impl':<8} {'seconds':>8} {'MB/s':>8} {'chunks':>8}  offsets")
+    for name, text in inputs:
+        size_mb = len(text) / (1024 * 1024)
+        for label, chunker in (("legacy", legacy), ("spans", current)):
+            elapsed, chunks = time_chunker(chunker, text, args.repeat)
+            exact = all(text[chunk.start_char:chunk.end_char] == chunk.text for chunk in chunks)
+            print(f"{name:<16} {label:<8} {elapsed:8.3f} {size_mb / elapsed:8.2f} {len(chunks):8d}  {'exact' if exact else 'WRONG'}")
+
+if __name__ == "__main__":
+    main()
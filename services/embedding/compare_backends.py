@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Compare embedding inference backends on a sample corpus
+
+Encodes the same texts with every backend and reports throughput and the
+cosine agreement of each backend's vectors with the PyTorch fp32 reference,
+so the accuracy cost of switching EMBEDDING_BACKEND can be checked first.
+
+Usage:
+    python compare_backends.py                          # built-in sample sentences
+    python compare_backends.py --corpus lecture.pdf     # chunks of a PDF/DOCX/PPTX
+    python compare_backends.py --corpus queries.txt     # one text per line
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+
+import config
+from models.registry import BACKENDS, load_model
+
+SAMPLE_TEXTS = [
+    "What is deadlock and what are the four necessary conditions for it?",
+    "Explain paging and how the page table maps logical to physical addresses.",
+    "Compare preemptive and non-preemptive CPU scheduling algorithms.",
+    "A semaphore is an integer variable accessed only through wait and signal.",
+    "Thrashing occurs when a process spends more time paging than executing.",
+    "The fork system call creates a new process by duplicating the caller.",
+    "Round robin scheduling assigns a fixed time quantum to each process.",
+    "Banker's algorithm avoids deadlock by checking for a safe state.",
+    "Virtual memory lets a process use more memory than is physically available.",
+    "The critical section problem requires mutual exclusion, progress and bounded waiting.",
+]
+
+def load_corpus(path: str, limit: int) -> list[str]:
+    if not path:
+        return SAMPLE_TEXTS
+    corpus_path = Path(path)
+    if corpus_path.suffix.lower() == ".txt":
+        texts = [line.strip() for line in corpus_path.read_text().splitlines() if line.strip()]
+    else:
+        from utils.document_processor import DocumentProcessor
+        from utils.text_chunker import TextChunker
+        processor = DocumentProcessor()
+        text = processor.clean_text(processor.extract_text(str(corpus_path), corpus_path.name))
+        chunks = TextChunker(chunk_size=800, overlap_size=100).create_chunks(text, "compare", corpus_path.name)
+        texts = [chunk.text for chunk in chunks]
+    return texts[:limit]
+
+def encode(model, texts: list[str], batch_size: int) -> tuple[np.ndarray, float]:
+    model.encode(texts[:batch_size], batch_size=batch_size)  # warm up
+    start = time.perf_counter()
+    vectors = model.encode(texts, batch_size=batch_size, normalize_embeddings=True)
+    return np.asarray(vectors, dtype=np.float32), time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare embedding inference backends")
+    parser.add_argument("--model", default=config.EMBEDDING_MODEL)
+    parser.add_argument("--corpus", help="PDF/DOCX/PPTX document or .txt file with one text per line")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--limit", type=int, default=1000, help="Maximum number of texts")
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    texts = load_corpus(args.corpus, args.limit)
+    print(f"Comparing backends for {args.model} on {len(texts)} texts")
+    print("=" * 60)
+
+    reference = None
+    for backend in ["torch"] + [b for b in args.backends if b != "torch"]:
+        try:
+            model = load_model(args.model, backend)
+        except Exception as e:
+            print(f"❌ {backend}: could not load ({e})")
+            continue
+
+        vectors, elapsed = encode(model, texts, args.batch_size)
+        line = f"{backend:<12} {len(texts) / elapsed:8.1f} texts/s"
+        if reference is None:
+            reference = vectors
+            line += "   (reference)"
+        else:
+            cosine = np.sum(vectors * reference, axis=1)
+            line += (
+                f"   cosine mean {cosine.mean():.5f}"
+                f"  min {cosine.min():.5f}"
+                f"  p5 {np.percentile(cosine, 5):.5f}"
+            )
+        print(line)
+        del model
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Service configuration, read from environment variables
+"""
+
+import os
+
+# Storage
+CHROMA_DB_PATH = os.getenv("CHROMA_DB_PATH", "./chromadb")
+METADATA_DB_PATH = os.getenv("METADATA_DB_PATH", "./metadata.db")
+
+# Embedding model
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "BAAI/bge-base-en-v1.5")
+# Inference backend: torch, torch-int8 or onnx
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+# Load and warm up the model at startup; otherwise it loads on the first request
+EMBEDDING_WARM_UP = os.getenv("EMBEDDING_WARM_UP", "true").lower() not in ("0", "false", "no")
+
+# Encoder micro-batching
+ENCODE_MAX_BATCH_SIZE = int(os.getenv("ENCODE_MAX_BATCH_SIZE", "64"))
+ENCODE_MAX_WAIT_MS = float(os.getenv("ENCODE_MAX_WAIT_MS", "5"))
+
+# Query embedding cache
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "10000"))
+QUERY_CACHE_TTL_SECONDS = float(os.getenv("QUERY_CACHE_TTL_SECONDS", "3600"))
+
+# Persistent embedding cache for ingestion
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./embedding_cache.db")
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+
+# Persistent cache of cleaned text and chunks per uploaded file
+ARTIFACT_CACHE_PATH = os.getenv("ARTIFACT_CACHE_PATH", "./artifact_cache.db")
+ARTIFACT_CACHE_MAX_BYTES = int(os.getenv("ARTIFACT_CACHE_MAX_BYTES", str(512 * 1024 ** 2)))
+# Uploads longer than this (cleaned characters) are not cached, so ingestion never holds more text than this
+ARTIFACT_CACHE_MAX_DOCUMENT_CHARS = int(os.getenv("ARTIFACT_CACHE_MAX_DOCUMENT_CHARS", str(4 * 1024 ** 2)))
+
+# Executor for blocking document processing
+EXECUTOR_KIND = os.getenv("EXECUTOR_KIND", "thread")
+EXECUTOR_WORKERS = int(os.getenv("EXECUTOR_WORKERS", str(min(4, os.cpu_count() or 1))))
+EXECUTOR_MAX_INFLIGHT = int(os.getenv("EXECUTOR_MAX_INFLIGHT", "8"))
+
+# Page-parallel PDF extraction
+PDF_EXTRACTION_WORKERS = int(os.getenv("PDF_EXTRACTION_WORKERS", str(os.cpu_count() or 1)))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "50"))
+
+# Uploads
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(200 * 1024 * 1024)))
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR") or None
+
+# Lexical (BM25) index for hybrid search
+LEXICAL_INDEX_PATH = os.getenv("LEXICAL_INDEX_PATH", "./lexical_index.pkl")
+
+# Chunking: "chars" budgets by characters, "tokens" by the embedding model's tokenizer
+CHUNK_MODE = os.getenv("CHUNK_MODE", "chars")
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "800"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "100"))
+CHUNK_TOKEN_TARGET = int(os.getenv("CHUNK_TOKEN_TARGET", "384"))
+CHUNK_TOKEN_OVERLAP = int(os.getenv("CHUNK_TOKEN_OVERLAP", "48"))
+
+# Streaming ingestion: chunks per embedding / Chroma write, items buffered between stages
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "256"))
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "4"))
+
+# Background ingestion jobs
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", "./jobs.db")
+JOB_SPOOL_DIR = os.getenv("JOB_SPOOL_DIR", "./job_uploads")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Finished jobs are deleted this long after they finished
+JOB_RETENTION_HOURS = float(os.getenv("JOB_RETENTION_HOURS", "168"))
+
+# Near-duplicate detection at ingest: "off", "flag" (report matches) or "dedupe" (skip ingesting near-copies)
+NEAR_DUPLICATE_ACTION = os.getenv("NEAR_DUPLICATE_ACTION", "flag")
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.8"))
+MINHASH_NUM_PERM = int(os.getenv("MINHASH_NUM_PERM", "128"))
+MINHASH_SHINGLE_SIZE = int(os.getenv("MINHASH_SHINGLE_SIZE", "5"))
@@ -0,0 +1,73 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Tuple
+
+import numpy as np
+
+class EncodeBatcher:
+    """
+    Dynamic micro-batching in front of an encode function.
+
+    Concurrent callers submit their texts to a shared queue. A single worker
+    thread collects pending requests until either `max_wait_ms` has passed
+    since the first one arrived or `max_batch_size` texts are waiting, runs
+    one batched encode and hands each caller its own slice of the result.
+    """
+
+    def __init__(self, encode_fn: Callable[[List[str]], np.ndarray], max_batch_size: int = 64, max_wait_ms: float = 5.0):
+        """
+        Args:
+            encode_fn: Function mapping a list of texts to a 2D embedding array
+            max_batch_size: Maximum number of texts per batched encode
+            max_wait_ms: How long to wait for more requests before encoding
+        """
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue[Tuple[List[str], Future]]" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="encode-batcher", daemon=True)
+        self._worker.start()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Encode texts, sharing the forward pass with concurrent callers."""
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        future: Future = Future()
+        self._queue.put((list(texts), future))
+        return future.result()
+
+    def _collect(self) -> List[Tuple[List[str], Future]]:
+        """Block for the first request, then gather more until the window closes."""
+        first = self._queue.get()
+        batch = [first]
+        size = len(first[0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            texts = [text for item_texts, _ in batch for text in item_texts]
+            try:
+                embeddings = self.encode_fn(texts)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            offset = 0
+            for item_texts, future in batch:
+                future.set_result(embeddings[offset:offset + len(item_texts)])
+                offset += len(item_texts)
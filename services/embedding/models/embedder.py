@@ -1,13 +1,22 @@
 from sentence_transformers import SentenceTransformer
 import numpy as np
 
+import config
+from models.registry import model_registry
+
 class Embedder:
-    def __init__(self, model_name="BAAI/bge-base-en-v1.5"):
-        self.model = SentenceTransformer(model_name, trust_remote_code=True)
+    def __init__(self, model_name=config.EMBEDDING_MODEL, backend=config.EMBEDDING_BACKEND):
+        self.model_name = model_name
+        self.backend = backend
+
+    @property
+    def model(self) -> SentenceTransformer:
+        # Shared, lazily loaded instance from the process-wide registry
+        return model_registry.get(self.model_name, self.backend)
 
     def embed(self, texts: str | list[str]) -> np.ndarray:
         if isinstance(texts, str):
             texts = [texts]
         return self.model.encode(texts, normalize_embeddings=True)
 
-embedder_instance = Embedder()
\ No newline at end of file
+embedder_instance = Embedder()
@@ -0,0 +1,99 @@
+import gc
+import threading
+from typing import Dict, List
+
+from sentence_transformers import SentenceTransformer
+
+BACKENDS = ("torch", "torch-int8", "onnx")
+
+def model_id(model_name: str, backend: str = "torch") -> str:
+    """Identifier for a model/backend pair, used as registry and cache key."""
+    return model_name if backend == "torch" else f"{model_name}@{backend}"
+
+def load_model(model_name: str, backend: str = "torch") -> SentenceTransformer:
+    """
+    Load a model with the requested CPU inference backend.
+
+    - torch: plain PyTorch fp32
+    - torch-int8: PyTorch with Linear layers dynamically quantized to int8
+    - onnx: ONNX Runtime export (needs `pip install "sentence-transformers[onnx]"`)
+    """
+    if backend == "torch":
+        return SentenceTransformer(model_name, trust_remote_code=True)
+    if backend == "torch-int8":
+        import torch
+        model = SentenceTransformer(model_name, device="cpu", trust_remote_code=True)
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    if backend == "onnx":
+        try:
+            return SentenceTransformer(model_name, backend="onnx", trust_remote_code=True)
+        except ImportError as e:
+            raise ImportError(
+                f"ONNX backend requires optimum and onnxruntime: pip install \"sentence-transformers[onnx]\" ({e})"
+            )
+    raise ValueError(f"Unsupported embedding backend: {backend}. Supported backends: {BACKENDS}")
+
+class ModelRegistry:
+    """
+    Process-wide registry of SentenceTransformer models.
+
+    Each model is loaded once, on first use, and shared by every caller
+    (Embedder, ChromaStore, scripts). Models can also be loaded ahead of
+    time with `preload` and released with `unload`.
+    """
+
+    def __init__(self):
+        self._models: Dict[str, SentenceTransformer] = {}
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(self, model_name: str, backend: str = "torch") -> SentenceTransformer:
+        """Return the shared instance of a model, loading it if needed."""
+        key = model_id(model_name, backend)
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+        # Per-model lock so loading one model does not block lookups of another
+        with load_lock:
+            model = self._models.get(key)
+            if model is None:
+                print(f"Loading embedding model: {model_name} ({backend})")
+                model = load_model(model_name, backend)
+                self._models[key] = model
+            return model
+
+    def preload(self, *model_names: str, backend: str = "torch"):
+        """Load models ahead of their first use."""
+        for model_name in model_names:
+            self.get(model_name, backend)
+
+    def unload(self, model_name: str, backend: str = "torch") -> bool:
+        """Drop the registry's reference to a model so its memory can be reclaimed."""
+        with self._lock:
+            model = self._models.pop(model_id(model_name, backend), None)
+        if model is None:
+            return False
+        del model
+        gc.collect()
+        return True
+
+    def loaded_models(self) -> List[str]:
+        return list(self._models)
+
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        Approximate bytes held by each loaded model's parameters and buffers.
+
+        Quantized weights and ONNX Runtime sessions live outside PyTorch
+        parameters and are not counted.
+        """
+        usage = {}
+        for model_name, model in list(self._models.items()):
+            tensors = list(model.parameters()) + list(model.buffers())
+            usage[model_name] = sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+        return usage
+
+model_registry = ModelRegistry()
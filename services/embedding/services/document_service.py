@@ -1,165 +1,611 @@
+import os
 import uuid
+import hashlib
 import time
+import asyncio
+import tempfile
+import zipfile
+from bisect import bisect_right
 from datetime import datetime
-from typing import List, Dict, Any
+from pathlib import Path, PurePosixPath
+from typing import List, Dict, Any, Callable, Optional, Sequence, Tuple
+import numpy as np
 from fastapi import UploadFile, HTTPException
 
-from utils.document_processor import DocumentProcessor
-from utils.text_chunker import TextChunker, TextChunk
-from utils.schema_ import DocumentUploadResponse, DocumentInfo, ChunkInfo
+from utils.document_processor import DocumentProcessor, FileSource
+from utils.text_chunker import TextChunker, TextChunk, make_chunk_id
+from utils.schema_ import DocumentUploadResponse, DocumentInfo, ChunkInfo, BulkUploadItem, BulkUploadResponse, NearDuplicate
 from utils.metadata_storage import MetadataStorage
+from utils.document_index import DocumentIndex, DocumentRecord
+from utils.executor import BlockingExecutor
+from utils.minhash import MinHash, NearDuplicateIndex, jaccard
+from utils.artifact_cache import ArtifactCache, DocumentArtifacts
+from utils.upload_spool import spool_upload
+from services.ingest_pipeline import IngestPipeline, chunk_metadata
 from vectordb.chroma_store import ChromaStore
+import config
+
+def assign_page_numbers(chunks: List[TextChunk], page_info: list, offsets: Sequence[int] = None):
+    """
+    Set page_number on chunks from the page ranges of the extracted text.
+    
+    Args:
+        chunks: Chunks whose offsets refer to the cleaned text
+        page_info: Page ranges in extracted-text offsets, ordered by start_char
+        offsets: Map from cleaned to extracted positions (from
+            `clean_text_with_offsets`); None when the offsets already agree
+    """
+    if not page_info or not chunks:
+        return
+    
+    page_starts = [page['start_char'] for page in page_info]
+    for chunk in chunks:
+        # Find which page this chunk's midpoint falls on
+        chunk_midpoint = (chunk.start_char + chunk.end_char) // 2
+        if offsets is not None and len(offsets):
+            chunk_midpoint = offsets[min(chunk_midpoint, len(offsets) - 1)]
+        page_index = bisect_right(page_starts, chunk_midpoint) - 1
+        if page_index >= 0:
+            chunk.page_number = page_info[page_index]['page_number']
+
+def prepare_artifacts(document_processor: DocumentProcessor, text_chunker: TextChunker, source: FileSource, filename: str) -> DocumentArtifacts:
+    """
+    Extract, clean and chunk a document into cacheable artifacts.
+
+    Module-level so it can run in a process pool; the text is empty when
+    the document has no text.
+    """
+    extracted_text, page_info = document_processor.extract_text_with_page_info(source, filename)
+    cleaned_text, offsets = document_processor.clean_text_with_offsets(extracted_text)
+    if not cleaned_text.strip():
+        return DocumentArtifacts("")
+
+    chunks = text_chunker.create_chunks(
+        text=cleaned_text,
+        document_id="",
+        document_name=filename
+    )
+    assign_page_numbers(chunks, page_info, offsets)
+    return DocumentArtifacts.from_chunks(cleaned_text, chunks)
+
+def prepare_chunks(document_processor: DocumentProcessor, text_chunker: TextChunker, source: FileSource, filename: str, document_id: str, minhash: MinHash = None) -> tuple[int, List[TextChunk], Optional[np.ndarray]]:
+    """
+    Extract, clean and chunk a document.
+
+    Module-level so it can run in a process pool; returns the cleaned text
+    length, the chunks (an empty list when there is no text) and, with
+    `minhash`, the MinHash signature of the cleaned text.
+    """
+    artifacts = prepare_artifacts(document_processor, text_chunker, source, filename)
+    if not artifacts.text:
+        return 0, [], None
+    signature = minhash.signature(artifacts.text) if minhash is not None else None
+    return len(artifacts.text), artifacts.chunks(document_id, filename), signature
+
+def archive_entries(archive_path: str, max_bytes: int = 0) -> List[tuple[str, Optional[str]]]:
+    """
+    Names and SHA-256 content hashes of the file entries of a ZIP archive.
+
+    Directories and macOS metadata are skipped. Hashing streams through the
+    entries once, which is cheap next to extracting their text. Entries
+    larger than `max_bytes` get None instead of a hash: those declaring a
+    larger size are not read at all, and no entry is decompressed past the
+    limit, whatever its header claims.
+    """
+    entries = []
+    with zipfile.ZipFile(archive_path) as archive:
+        for info in archive.infolist():
+            if info.is_dir() or info.filename.startswith("__MACOSX/") or PurePosixPath(info.filename).name.startswith("."):
+                continue
+            if max_bytes and info.file_size > max_bytes:
+                entries.append((info.filename, None))
+                continue
+            digest = hashlib.sha256()
+            total = 0
+            with archive.open(info) as entry:
+                for block in iter(lambda: entry.read(1024 * 1024), b""):
+                    total += len(block)
+                    if max_bytes and total > max_bytes:
+                        digest = None
+                        break
+                    digest.update(block)
+            entries.append((info.filename, digest.hexdigest() if digest else None))
+    return entries
+
+def prepare_archive_entry(document_processor: DocumentProcessor, text_chunker: TextChunker, archive_path: str, entry_name: str, document_id: str, max_bytes: int = 0, spool_dir: str = None, minhash: MinHash = None) -> tuple[int, List[TextChunk], Optional[np.ndarray]]:
+    """
+    Extract, clean and chunk one document stored in a ZIP archive.
+
+    The entry is streamed out of the archive into a temporary file by the
+    worker itself, so entries of one archive are unpacked in parallel.
+    """
+    filename = PurePosixPath(entry_name).name
+    fd, path = tempfile.mkstemp(prefix="entry_", suffix=PurePosixPath(filename).suffix.lower(), dir=spool_dir)
+    try:
+        with os.fdopen(fd, "wb") as out, zipfile.ZipFile(archive_path) as archive, archive.open(entry_name) as entry:
+            total = 0
+            while True:
+                block = entry.read(1024 * 1024)
+                if not block:
+                    break
+                total += len(block)
+                if max_bytes and total > max_bytes:
+                    raise ValueError(f"File too large. Maximum upload size is {max_bytes} bytes")
+                out.write(block)
+        return prepare_chunks(document_processor, text_chunker, path, filename, document_id, minhash)
+    finally:
+        os.unlink(path)
+
+class NearDuplicateFound(Exception):
+    """Raised before embedding when an upload is a near-copy of a stored document."""
+    def __init__(self, record: DocumentRecord):
+        super().__init__(record.document_id)
+        self.record = record
 
 class DocumentService:
-    def __init__(self, chroma_store: ChromaStore):
+    def __init__(self, chroma_store: ChromaStore, executor: BlockingExecutor = None, max_upload_bytes: int = config.MAX_UPLOAD_BYTES):
         self.chroma_store = chroma_store
-        self.document_processor = DocumentProcessor()
-        self.text_chunker = TextChunker(chunk_size=800, overlap_size=100)
-        self.metadata_storage = MetadataStorage()  # File-based metadata storage
-        self.documents_metadata = {}  # In-memory cache for document metadata
-        self._load_documents_metadata()  # Load existing metadata from file
+        self.max_upload_bytes = max_upload_bytes
+        self.executor = executor or BlockingExecutor(
+            kind=config.EXECUTOR_KIND,
+            max_workers=config.EXECUTOR_WORKERS,
+            max_inflight=config.EXECUTOR_MAX_INFLIGHT
+        )
+        self.document_processor = DocumentProcessor(
+            extraction_workers=config.PDF_EXTRACTION_WORKERS,
+            parallel_min_pages=config.PDF_PARALLEL_MIN_PAGES
+        )
+        self.text_chunker = TextChunker(
+            chunk_size=config.CHUNK_SIZE,
+            overlap_size=config.CHUNK_OVERLAP,
+            mode=config.CHUNK_MODE,
+            tokenizer_name=config.EMBEDDING_MODEL,
+            token_target=config.CHUNK_TOKEN_TARGET,
+            token_overlap=config.CHUNK_TOKEN_OVERLAP
+        )
+        # Cleaned text and chunks of files seen before, by content hash
+        self.artifact_cache = ArtifactCache(db_file=config.ARTIFACT_CACHE_PATH, max_bytes=config.ARTIFACT_CACHE_MAX_BYTES)
+        self.ingest_pipeline = IngestPipeline(self.document_processor, self.text_chunker, self.chroma_store, artifact_cache=self.artifact_cache)
+        self.metadata_storage = MetadataStorage(storage_file=config.METADATA_DB_PATH)  # SQLite-backed metadata storage
+        # Single in-memory metadata index, written through to the metadata store
+        self.document_index = DocumentIndex(self.metadata_storage)
+        # MinHash/LSH index of document texts for near-duplicate detection
+        self.minhash = MinHash(num_perm=config.MINHASH_NUM_PERM, shingle_size=config.MINHASH_SHINGLE_SIZE)
+        self.near_duplicates = NearDuplicateIndex(self.metadata_storage, self.minhash, threshold=config.NEAR_DUPLICATE_THRESHOLD)
+        self.near_duplicate_action = config.NEAR_DUPLICATE_ACTION
+        # Document records describe the collection's chunks; drop them when it is reset
+        self.chroma_store.on_reset(self.clear_documents)
+        self._purge_metadata_vectors()
+    
+    def clear_documents(self):
+        """Forget all documents; called when the vector collection is reset."""
+        self.document_index.clear()
+        self.near_duplicates.clear()
+        print("🧹 Cleared document metadata after collection reset")
     
-    def _load_documents_metadata(self):
-        """Load document metadata from file storage."""
+    def _purge_metadata_vectors(self):
+        """Remove "doc_meta_" entries older versions stored in the vector index."""
         try:
-            # Load from file-based storage
-            all_docs = self.metadata_storage.get_all_documents()
-            for doc in all_docs:
-                self.documents_metadata[doc["document_id"]] = doc
-            
-            print(f"📚 Loaded {len(self.documents_metadata)} documents from metadata file")
-            
+            legacy = self.chroma_store.collection.get(where={"type": "document_metadata"}, include=[])
+            if legacy["ids"]:
+                self.chroma_store.delete_ids(legacy["ids"])
+                print(f"🧹 Removed {len(legacy['ids'])} document metadata entries from the vector index")
         except Exception as e:
-            print(f"⚠️  Error loading document metadata: {e}")
+            print(f"⚠️  Error removing document metadata entries: {e}")
     
-    def _store_document_metadata(self, document_id: str, document_name: str, upload_date: datetime, total_chunks: int, total_characters: int, file_type: str):
-        """Store document metadata in ChromaDB for persistence."""
-        try:
-            # Create a special metadata entry for the document
-            metadata_entry = {
-                "document_id": document_id,
-                "document_name": document_name,
-                "upload_date": upload_date.isoformat(),
-                "total_chunks": total_chunks,
-                "total_characters": total_characters,
-                "file_type": file_type,
-                "type": "document_metadata"  # Special type to identify metadata entries
-            }
-            
-            # Store as a special entry in ChromaDB
-            self.chroma_store.collection.add(
-                ids=[f"doc_meta_{document_id}"],
-                documents=[f"Document metadata for {document_name}"],
-                metadatas=[metadata_entry]
+    def validate_upload(self, file: UploadFile):
+        """Reject uploads whose file format is not supported."""
+        if not self.document_processor.is_supported_format(file.filename):
+            raise HTTPException(
+                status_code=400, 
+                detail=f"Unsupported file format. Supported formats: {self.document_processor.supported_formats}"
             )
-            
-        except Exception as e:
-            print(f"⚠️  Error storing document metadata: {e}")
     
-    async def process_document(self, file: UploadFile) -> DocumentUploadResponse:
+    async def process_document(self, file: UploadFile, force: bool = False) -> DocumentUploadResponse:
         """
         Process uploaded document: extract text, chunk, and store in vector database.
+        
+        A file whose content was uploaded before returns the existing
+        document without being processed again, unless `force` is set.
         """
         start_time = time.time()
+        self.validate_upload(file)
         
+        # Stream the upload to disk instead of reading it into memory, hashing it on the way
+        file_path, content_hash = await spool_upload(file, self.max_upload_bytes, directory=config.UPLOAD_SPOOL_DIR)
         try:
-            # Validate file format
-            if not self.document_processor.is_supported_format(file.filename):
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"Unsupported file format. Supported formats: {self.document_processor.supported_formats}"
+            existing = None if force else self.find_stored(content_hash)
+            if existing:
+                return self.duplicate_response(existing, time.time() - start_time)
+            return await self.ingest_file(file_path, file.filename, str(uuid.uuid4()), content_hash=content_hash, force=force)
+        finally:
+            file_path.unlink(missing_ok=True)
+    
+    def duplicate_response(self, record: DocumentRecord, processing_time: float = 0.0, near_duplicates: List[NearDuplicate] = None) -> DocumentUploadResponse:
+        """Upload result pointing at an already stored document with the same content."""
+        return DocumentUploadResponse(
+            document_id=record.document_id,
+            document_name=record.document_name,
+            chunks_created=record.total_chunks,
+            total_characters=record.total_characters,
+            processing_time=processing_time,
+            success=True,
+            duplicate=True,
+            near_duplicates=near_duplicates or []
+        )
+    
+    def has_chunks(self, document_id: str) -> bool:
+        """Whether the document's chunks are still in the vector collection."""
+        chunk_ids = self._chunk_ids(document_id)
+        return bool(chunk_ids) and bool(self.chroma_store.collection.get(ids=chunk_ids[:1], include=[])["ids"])
+    
+    def find_stored(self, content_hash: str) -> Optional[DocumentRecord]:
+        """
+        Stored document whose uploaded file had this content hash.
+        
+        A record whose chunks are no longer in the collection is stale; it
+        is dropped so the content is ingested again.
+        """
+        record = self.document_index.find_by_hash(content_hash)
+        while record is not None and not self.has_chunks(record.document_id):
+            print(f"🧹 Dropping stale document record {record.document_id}: its chunks are gone")
+            self.document_index.remove(record.document_id)
+            record = self.document_index.find_by_hash(content_hash)
+        return record
+    
+    def find_near_duplicates(self, signature: np.ndarray) -> List[Tuple[str, float]]:
+        """
+        Stored documents whose text is at least NEAR_DUPLICATE_THRESHOLD similar, most similar first.
+        
+        Matches whose chunks are no longer in the collection are skipped.
+        """
+        return [
+            match for match in self.near_duplicates.find(signature)
+            if match[0] in self.document_index and self.has_chunks(match[0])
+        ]
+    
+    async def ingest_file(self, file_path: Path, filename: str, document_id: str, progress: Callable[[dict], None] = None, content_hash: str = None, force: bool = False) -> DocumentUploadResponse:
+        """
+        Extract, chunk, embed and store a spooled upload under `document_id`.
+        
+        Chunk ids are deterministic, so ingesting the same file again under
+        the same document id (e.g. resuming an interrupted job) overwrites
+        instead of duplicating. The caller owns `file_path`.
+        
+        Stored documents with nearly the same text are reported in
+        `near_duplicates`; with NEAR_DUPLICATE_ACTION "dedupe" (and without
+        `force`) the upload is stopped before embedding and the most similar
+        document is returned as a duplicate instead.
+        
+        Args:
+            progress: Receives pipeline progress snapshots (see `IngestPipeline.run`)
+            content_hash: SHA-256 of the file, recorded for duplicate detection
+                and used to reuse cached chunks of the same file
+            force: Ingest the document even if it is a near-duplicate
+        """
+        start_time = time.time()
+        upload_date = datetime.now()
+        matches = []
+        
+        def gate(signature: np.ndarray):
+            matches.extend(self.find_near_duplicates(signature))
+            if matches:
+                raise NearDuplicateFound(self.document_index.get(matches[0][0]))
+        
+        try:
+            # Stream extraction, chunking, embedding and storage off the event loop
+            async with self.executor.job():
+                total_characters, total_chunks, signature = await self.executor.run_io(
+                    self.ingest_pipeline.run,
+                    str(file_path),
+                    filename,
+                    document_id,
+                    upload_date,
+                    progress,
+                    self.minhash,
+                    gate if self.near_duplicate_action == "dedupe" and not force else None,
+                    content_hash
                 )
             
-            # Read file content
-            file_content = await file.read()
-            if len(file_content) == 0:
-                raise HTTPException(status_code=400, detail="Empty file")
-            
-            # Extract text with page information for PDFs
-            extracted_text, page_info = self.document_processor.extract_text_with_page_info(file_content, file.filename)
-            cleaned_text = self.document_processor.clean_text(extracted_text)
-            
-            if not cleaned_text.strip():
+            if not total_characters:
                 raise HTTPException(status_code=400, detail="No text content found in document")
             
-            # Generate document ID
-            document_id = str(uuid.uuid4())
-            
-            # Create chunks with page information
-            chunks = self._create_chunks_with_page_info(
-                text=cleaned_text,
-                document_id=document_id,
-                document_name=file.filename,
-                page_info=page_info
-            )
-            
-            if not chunks:
+            if not total_chunks:
                 raise HTTPException(status_code=400, detail="No valid chunks created from document")
             
-            # Prepare chunks for storage
-            chunk_texts = []
-            chunk_metadatas = []
-            chunk_ids = []
-            
-            for chunk in chunks:
-                chunk_id = f"{document_id}_chunk_{chunk.chunk_index}"
-                chunk_texts.append(chunk.text)
-                chunk_metadatas.append({
-                    "document_id": document_id,
-                    "document_name": file.filename,
-                    "chunk_index": chunk.chunk_index,
-                    "total_chunks": chunk.total_chunks,
-                    "start_char": chunk.start_char,
-                    "end_char": chunk.end_char,
-                    "page_number": chunk.page_number,
-                    "file_type": file.filename.split('.')[-1].lower(),
-                    "upload_date": datetime.now().isoformat()
-                })
-                chunk_ids.append(chunk_id)
-            
-            # Store in vector database
-            self.chroma_store.add_texts(
-                texts=chunk_texts,
-                metadatas=chunk_metadatas
-            )
-            
             # Store document metadata
-            upload_date = datetime.now()
-            self.documents_metadata[document_id] = {
-                "document_id": document_id,
-                "document_name": file.filename,
-                "upload_date": upload_date,
-                "total_chunks": len(chunks),
-                "total_characters": len(cleaned_text),
-                "file_type": file.filename.split('.')[-1].lower()
-            }
-            
-            # Store document metadata in file storage for persistence
-            self.metadata_storage.add_document(
-                document_id, 
-                file.filename, 
-                len(chunks), 
-                len(cleaned_text), 
-                file.filename.split('.')[-1].lower()
-            )
+            self.document_index.add(DocumentRecord(
+                document_id=document_id,
+                document_name=filename,
+                upload_date=upload_date,
+                total_chunks=total_chunks,
+                total_characters=total_characters,
+                file_type=filename.split('.')[-1].lower(),
+                content_hash=content_hash
+            ))
+            if self.near_duplicate_action != "off":
+                matches = self.find_near_duplicates(signature)
+            self.near_duplicates.add(document_id, signature)
             
             processing_time = time.time() - start_time
             
             return DocumentUploadResponse(
                 document_id=document_id,
-                document_name=file.filename,
-                chunks_created=len(chunks),
-                total_characters=len(cleaned_text),
+                document_name=filename,
+                chunks_created=total_chunks,
+                total_characters=total_characters,
                 processing_time=processing_time,
-                success=True
+                success=True,
+                near_duplicates=[NearDuplicate(document_id=match_id, similarity=similarity) for match_id, similarity in matches]
             )
             
+        except NearDuplicateFound as e:
+            return self.duplicate_response(
+                e.record,
+                time.time() - start_time,
+                [NearDuplicate(document_id=match_id, similarity=similarity) for match_id, similarity in matches]
+            )
         except HTTPException:
             raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error processing document: {str(e)}")
     
-    def _create_chunks_with_page_info(self, text: str, document_id: str, document_name: str, page_info: list) -> List[TextChunk]:
+    async def process_documents(self, files: List[UploadFile], force: bool = False) -> BulkUploadResponse:
+        """
+        Process many uploaded documents and ZIP archives of documents in one request.
+        
+        Every document (including each archive entry) is extracted and
+        chunked on its own worker, and the chunks of all documents share the
+        embedding and write batches. Failures are reported per document in
+        the manifest instead of failing the whole request. Documents whose
+        content is already stored, or appears earlier in the request, are
+        not processed again unless `force` is set. Near-duplicates of stored
+        documents or of earlier documents in the request are reported, or
+        skipped before embedding with NEAR_DUPLICATE_ACTION "dedupe".
+        """
+        start_time = time.time()
+        upload_date = datetime.now()
+        manifest: List[BulkUploadItem] = []
+        work = []  # (manifest item, content hash, worker function, arguments)
+        first_by_hash: Dict[str, BulkUploadItem] = {}
+        copies = []  # (manifest item, earlier item with the same or nearly the same content in this request)
+        spooled = []
+        
+        def is_duplicate(item: BulkUploadItem, content_hash: str) -> bool:
+            if force:
+                return False
+            existing = self.find_stored(content_hash)
+            if existing:
+                item.document_id = existing.document_id
+                item.success = item.duplicate = True
+                return True
+            if content_hash in first_by_hash:
+                copies.append((item, first_by_hash[content_hash]))
+                item.duplicate = True
+                return True
+            first_by_hash[content_hash] = item
+            return False
+        
+        accepted = []  # (manifest item, signature) of documents of this request being stored
+        
+        def is_near_duplicate(item: BulkUploadItem, signature: np.ndarray) -> bool:
+            if self.near_duplicate_action == "off":
+                return False
+            matches = [(match_id, similarity, None) for match_id, similarity in self.find_near_duplicates(signature)]
+            for other, other_signature in accepted:
+                similarity = jaccard(signature, other_signature)
+                if similarity >= self.near_duplicates.threshold:
+                    matches.append((other.document_id, similarity, other))
+            matches.sort(key=lambda match: match[1], reverse=True)
+            item.near_duplicates = [NearDuplicate(document_id=match_id, similarity=similarity) for match_id, similarity, _ in matches]
+            if matches and self.near_duplicate_action == "dedupe" and not force:
+                item.duplicate = True
+                match_id, _, other = matches[0]
+                if other is None:
+                    item.document_id = match_id
+                    item.success = True
+                else:
+                    copies.append((item, other))
+                return True
+            accepted.append((item, signature))
+            return False
+        # Documents are the unit of parallelism, so each one is extracted serially
+        document_processor = DocumentProcessor()
+        
+        try:
+            for file in files:
+                if file.filename.lower().endswith(".zip"):
+                    try:
+                        file_path, _ = await spool_upload(file, self.max_upload_bytes, directory=config.UPLOAD_SPOOL_DIR)
+                    except HTTPException as e:
+                        manifest.append(BulkUploadItem(document_name=file.filename, success=False, error=e.detail))
+                        continue
+                    spooled.append(file_path)
+                    try:
+                        entries = await self.executor.run_io(archive_entries, str(file_path), self.max_upload_bytes)
+                    except zipfile.BadZipFile:
+                        manifest.append(BulkUploadItem(document_name=file.filename, success=False, error="Invalid ZIP archive"))
+                        continue
+                    for entry_name, content_hash in entries:
+                        item = BulkUploadItem(document_name=PurePosixPath(entry_name).name, archive=file.filename, success=False)
+                        manifest.append(item)
+                        if not self.document_processor.is_supported_format(item.document_name):
+                            item.error = "Unsupported file format"
+                            continue
+                        if content_hash is None:
+                            item.error = f"File too large. Maximum upload size is {self.max_upload_bytes} bytes"
+                            continue
+                        if is_duplicate(item, content_hash):
+                            continue
+                        item.document_id = str(uuid.uuid4())
+                        work.append((item, content_hash, prepare_archive_entry, (
+                            document_processor, self.text_chunker, str(file_path), entry_name,
+                            item.document_id, self.max_upload_bytes, config.UPLOAD_SPOOL_DIR, self.minhash
+                        )))
+                elif self.document_processor.is_supported_format(file.filename):
+                    item = BulkUploadItem(document_name=file.filename, success=False)
+                    manifest.append(item)
+                    try:
+                        file_path, content_hash = await spool_upload(file, self.max_upload_bytes, directory=config.UPLOAD_SPOOL_DIR)
+                    except HTTPException as e:
+                        # Empty or too large: reported for this file only
+                        item.error = e.detail
+                        continue
+                    spooled.append(file_path)
+                    if is_duplicate(item, content_hash):
+                        continue
+                    item.document_id = str(uuid.uuid4())
+                    work.append((item, content_hash, prepare_chunks, (
+                        document_processor, self.text_chunker, str(file_path), file.filename, item.document_id, self.minhash
+                    )))
+                else:
+                    manifest.append(BulkUploadItem(document_name=file.filename, success=False, error="Unsupported file format"))
+            
+            async with self.executor.job():
+                await self._ingest_many(work, upload_date, is_near_duplicate)
+        finally:
+            for file_path in spooled:
+                file_path.unlink(missing_ok=True)
+        
+        # Near-duplicates are found last; resolve them before exact copies, which may point at them
+        for item, first in reversed(copies):
+            item.document_id = first.document_id
+            item.success = first.success
+            item.error = first.error
+        for item in manifest:
+            if not item.success:
+                item.document_id = None
+            elif item.duplicate:
+                record = self.document_index.get(item.document_id)
+                item.chunks_created = record.total_chunks
+                item.total_characters = record.total_characters
+        created = [item for item in manifest if item.success and not item.duplicate]
+        return BulkUploadResponse(
+            documents=manifest,
+            documents_created=len(created),
+            chunks_created=sum(item.chunks_created for item in created),
+            processing_time=time.time() - start_time,
+            success=all(item.success for item in manifest)
+        )
+    
+    @staticmethod
+    def _public_error(item: BulkUploadItem, error: Exception, message: str = "Error processing document") -> str:
+        """
+        Failure reason shown in the upload manifest.
+        
+        Client errors (4xx) are passed on; anything else is only logged, since
+        it may mention server paths such as the spooled upload.
+        """
+        if isinstance(error, HTTPException) and error.status_code < 500:
+            return str(error.detail)
+        print(f"❌ {message} '{item.document_name}': {error.detail if isinstance(error, HTTPException) else error}")
+        return message
+    
+    async def _ingest_many(self, work: list, upload_date: datetime, is_near_duplicate: Callable[[BulkUploadItem, np.ndarray], bool] = None):
+        """
+        Prepare documents on the CPU pool and embed their chunks in shared batches.
+        
+        At most two documents per worker are prepared ahead of the embedding
+        batches, which bounds the chunks held in memory. Prepared documents
+        for which `is_near_duplicate` returns True are not embedded.
+        """
+        batch_size = max(1, min(config.INGEST_BATCH_SIZE, self.chroma_store.max_batch_size))
+        window = asyncio.Semaphore(self.executor.max_workers * 2)
+        prepared = asyncio.Queue()
+        documents = {}  # document_id -> [manifest item, chunks not yet written, content hash, signature]
+        
+        async def prepare(item, content_hash, fn, args):
+            try:
+                outcome = await self.executor.run_cpu(fn, *args)
+            except Exception as e:
+                outcome = e
+            await prepared.put((item, content_hash, outcome))
+        
+        async def submit():
+            tasks = []
+            for item, content_hash, fn, args in work:
+                await window.acquire()
+                tasks.append(asyncio.create_task(prepare(item, content_hash, fn, args)))
+            await asyncio.gather(*tasks)
+        
+        async def flush(batch: List[TextChunk]):
+            batch = [chunk for chunk in batch if chunk.document_id in documents]
+            if not batch:
+                return
+            try:
+                await self.executor.run_io(self._write_chunks, batch, upload_date)
+            except Exception as e:
+                failed = {chunk.document_id for chunk in batch}
+                for document_id in failed:
+                    item = documents.pop(document_id)[0]
+                    item.chunks_created = item.total_characters = 0
+                    item.error = self._public_error(item, e, "Error storing chunks")
+                # Remove whatever the failed documents had already written
+                await self.executor.run_io(self.chroma_store.delete_where, {"document_id": {"$in": list(failed)}})
+                return
+            for chunk in batch:
+                entry = documents[chunk.document_id]
+                entry[1] -= 1
+                if not entry[1]:
+                    self._complete(entry[0], upload_date, entry[2], entry[3])
+                    del documents[chunk.document_id]
+        
+        producer = asyncio.create_task(submit())
+        pending: List[TextChunk] = []
+        try:
+            for _ in range(len(work)):
+                item, content_hash, outcome = await prepared.get()
+                window.release()
+                if isinstance(outcome, Exception):
+                    item.error = self._public_error(item, outcome)
+                    continue
+                total_characters, chunks, signature = outcome
+                if not total_characters:
+                    item.error = "No text content found in document"
+                    continue
+                if not chunks:
+                    item.error = "No valid chunks created from document"
+                    continue
+                if is_near_duplicate is not None and is_near_duplicate(item, signature):
+                    continue
+                item.total_characters = total_characters
+                item.chunks_created = len(chunks)
+                documents[item.document_id] = [item, len(chunks), content_hash, signature]
+                pending.extend(chunks)
+                while len(pending) >= batch_size:
+                    await flush(pending[:batch_size])
+                    pending = pending[batch_size:]
+            if pending:
+                await flush(pending)
+        finally:
+            producer.cancel()
+    
+    def _write_chunks(self, chunks: List[TextChunk], upload_date: datetime):
+        """Embed and store a batch of chunks that may come from several documents (blocking)."""
+        texts = [chunk.text for chunk in chunks]
+        self.chroma_store.add_embeddings(
+            texts=texts,
+            embeddings=self.chroma_store.embed_texts(texts),
+            metadatas=[chunk_metadata(chunk, chunk.document_name, upload_date) for chunk in chunks],
+            ids=[make_chunk_id(chunk.document_id, chunk.chunk_index) for chunk in chunks]
+        )
+    
+    def _complete(self, item: BulkUploadItem, upload_date: datetime, content_hash: str = None, signature: np.ndarray = None):
+        """Record a document of a bulk upload once all its chunks are stored."""
+        self.document_index.add(DocumentRecord(
+            document_id=item.document_id,
+            document_name=item.document_name,
+            upload_date=upload_date,
+            total_chunks=item.chunks_created,
+            total_characters=item.total_characters,
+            file_type=item.document_name.split('.')[-1].lower(),
+            content_hash=content_hash
+        ))
+        if signature is not None:
+            self.near_duplicates.add(item.document_id, signature)
+        item.success = True
+    
+    def _create_chunks_with_page_info(self, text: str, document_id: str, document_name: str, page_info: list, offsets: Sequence[int] = None) -> List[TextChunk]:
         """Create chunks with page information for better metadata."""
         chunks = self.text_chunker.create_chunks(
             text=text,
@@ -168,53 +614,37 @@ class DocumentService:
         )
         
         # Add page number information for PDFs
-        if page_info:
-            for chunk in chunks:
-                # Find which page this chunk belongs to
-                chunk_midpoint = (chunk.start_char + chunk.end_char) // 2
-                for page in page_info:
-                    if page['start_char'] <= chunk_midpoint <= page['end_char']:
-                        chunk.page_number = page['page_number']
-                        break
+        assign_page_numbers(chunks, page_info, offsets)
         
         return chunks
     
-    def get_document_list(self) -> List[DocumentInfo]:
-        """Get list of all uploaded documents."""
-        documents = []
-        for doc_id, metadata in self.documents_metadata.items():
-            documents.append(DocumentInfo(
-                document_id=metadata["document_id"],
-                document_name=metadata["document_name"],
-                upload_date=metadata["upload_date"],
-                total_chunks=metadata["total_chunks"],
-                total_characters=metadata["total_characters"],
-                file_type=metadata["file_type"]
-            ))
-        return documents
+    def get_document_list(self, file_type: str = None, document_name: str = None, uploaded_after: datetime = None, uploaded_before: datetime = None) -> List[DocumentInfo]:
+        """Get list of uploaded documents, optionally filtered via the metadata indexes."""
+        records = self.document_index.find(
+            file_type=file_type,
+            document_name=document_name,
+            uploaded_after=uploaded_after,
+            uploaded_before=uploaded_before
+        )
+        return [DocumentInfo(**record.to_dict()) for record in records]
     
     def delete_document(self, document_id: str) -> Dict[str, Any]:
         """Delete a document and all its chunks."""
-        if document_id not in self.documents_metadata:
+        if document_id not in self.document_index:
             raise HTTPException(status_code=404, detail="Document not found")
         
         # Get all chunk IDs for this document
-        chunk_ids = []
-        for i in range(self.documents_metadata[document_id]["total_chunks"]):
-            chunk_ids.append(f"{document_id}_chunk_{i}")
-        
-        # Add metadata ID to deletion list
-        chunk_ids.append(f"doc_meta_{document_id}")
+        chunk_ids = self._chunk_ids(document_id)
         
-        # Delete chunks and metadata from vector database
+        # Delete chunks from vector database
         try:
-            self.chroma_store.collection.delete(ids=chunk_ids)
+            self.chroma_store.delete_ids(chunk_ids)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error deleting chunks: {str(e)}")
         
-        # Remove document metadata from memory and file storage
-        del self.documents_metadata[document_id]
-        self.metadata_storage.delete_document(document_id)
+        # Remove document metadata from memory and the metadata store
+        self.document_index.remove(document_id)
+        self.near_duplicates.remove(document_id)
         
         return {
             "status": "success",
@@ -222,16 +652,32 @@ class DocumentService:
             "chunks_deleted": len(chunk_ids)
         }
     
+    def _chunk_ids(self, document_id: str) -> List[str]:
+        """
+        Vector-store ids of a document's chunks.
+        
+        Derived from the deterministic id scheme; documents stored before
+        it was used have random ids and fall back to a metadata lookup.
+        """
+        total_chunks = self.document_index.get(document_id).total_chunks
+        chunk_ids = [make_chunk_id(document_id, i) for i in range(total_chunks)]
+        if chunk_ids and not self.chroma_store.collection.get(ids=chunk_ids[:1], include=[])["ids"]:
+            legacy = self.chroma_store.collection.get(where={"document_id": document_id}, include=[])
+            if legacy["ids"]:
+                return legacy["ids"]
+        return chunk_ids
+    
     def get_document_chunks(self, document_id: str) -> List[ChunkInfo]:
         """Get all chunks for a specific document."""
-        if document_id not in self.documents_metadata:
+        if document_id not in self.document_index:
             raise HTTPException(status_code=404, detail="Document not found")
         
-        # Query vector database for chunks of this document
+        # Chunks stored by versions that left out total_chunks fall back to the document record
+        total_chunks = self.document_index.get(document_id).total_chunks
+        
+        # Fetch the chunks of this document directly by id
         try:
-            results = self.chroma_store.collection.get(
-                where={"document_id": document_id}
-            )
+            results = self.chroma_store.get_ids(self._chunk_ids(document_id))
             
             chunks = []
             for i, (chunk_id, text, metadata) in enumerate(zip(
@@ -243,7 +689,7 @@ class DocumentService:
                     chunk_id=chunk_id,
                     text=text,
                     chunk_index=metadata.get("chunk_index", i),
-                    total_chunks=metadata.get("total_chunks", 0),
+                    total_chunks=metadata.get("total_chunks", total_chunks),
                     document_id=metadata.get("document_id", document_id),
                     document_name=metadata.get("document_name", ""),
                     start_char=metadata.get("start_char", 0),
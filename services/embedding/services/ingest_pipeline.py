@@ -0,0 +1,284 @@
+import queue
+import threading
+from bisect import bisect_right
+from datetime import datetime
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from utils.document_processor import DocumentProcessor, FileSource
+from utils.minhash import MinHash, MinHasher
+from utils.artifact_cache import ArtifactCache, DocumentArtifacts, chunker_key
+from utils.text_chunker import TextChunker, TextChunk, make_chunk_id
+from vectordb.chroma_store import ChromaStore
+import config
+
+_DONE = object()
+
+class _StageError:
+    """Exception raised inside a stage thread, handed to the consumer to re-raise."""
+    def __init__(self, error: BaseException):
+        self.error = error
+
+def threaded(iterable: Iterable, maxsize: int, name: str) -> Iterator:
+    """
+    Iterate `iterable` in a background thread, buffering at most `maxsize` items.
+
+    The producer blocks while the queue is full, so a slow consumer bounds
+    how far ahead the stage runs. Errors in the producer are re-raised in
+    the consumer; closing the returned generator stops the producer at its
+    next item.
+    """
+    items = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+            put(_DONE)
+        except BaseException as e:
+            put(_StageError(e))
+        finally:
+            if hasattr(iterable, "close"):
+                iterable.close()
+
+    thread = threading.Thread(target=produce, name=name, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _StageError):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+
+def chunk_metadata(chunk: TextChunk, document_name: str, upload_date: datetime) -> dict:
+    """Vector-store metadata of a document chunk."""
+    return {
+        "document_id": chunk.document_id,
+        "document_name": document_name,
+        "chunk_index": chunk.chunk_index,
+        # 0 for streamed chunks until the pipeline has counted them
+        "total_chunks": chunk.total_chunks,
+        "start_char": chunk.start_char,
+        "end_char": chunk.end_char,
+        "page_number": chunk.page_number,
+        "file_type": document_name.split('.')[-1].lower(),
+        "upload_date": upload_date.isoformat(),
+        # Numeric copy of upload_date for range filters in search
+        "upload_timestamp": upload_date.timestamp()
+    }
+
+class IngestPipeline:
+    """
+    Streaming extract → clean → chunk → embed → write ingestion of one document.
+
+    Extraction, cleaning/chunking and embedding each run in their own thread
+    and hand work to the next stage through bounded queues, so page N+1 is
+    extracted while the chunks of page N are embedded and the previous batch
+    is written to Chroma. Memory is bounded by the queue sizes and batch
+    size rather than by the size of the document.
+
+    With an artifact cache, a file whose cleaned text and chunks are cached
+    goes straight to embedding, and the artifacts of other files are cached
+    once they are chunked. That keeps their cleaned text in memory, so only
+    documents of up to `artifact_max_chars` characters are cached.
+    """
+
+    def __init__(self, document_processor: DocumentProcessor, text_chunker: TextChunker, chroma_store: ChromaStore, batch_size: int = config.INGEST_BATCH_SIZE, queue_size: int = config.INGEST_QUEUE_SIZE, artifact_cache: Optional[ArtifactCache] = None, artifact_max_chars: int = config.ARTIFACT_CACHE_MAX_DOCUMENT_CHARS):
+        """
+        Args:
+            document_processor: Extracts and cleans document text
+            text_chunker: Splits the cleaned text into chunks
+            chroma_store: Embeds chunks and stores them
+            batch_size: Chunks per embedding / Chroma write (capped by Chroma's max batch size)
+            queue_size: Items buffered between two stages
+            artifact_cache: Cleaned text and chunks of files by content hash
+            artifact_max_chars: Longest cleaned text that is collected for the artifact cache
+        """
+        self.document_processor = document_processor
+        self.text_chunker = text_chunker
+        self.chroma_store = chroma_store
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.artifact_cache = artifact_cache
+        self.artifact_max_chars = artifact_max_chars
+
+    def run(self, source: FileSource, filename: str, document_id: str, upload_date: datetime, progress: Optional[Callable[[dict], None]] = None, minhash: Optional[MinHash] = None, gate: Optional[Callable[[np.ndarray], None]] = None, content_hash: Optional[str] = None) -> Tuple[int, int, Optional[np.ndarray]]:
+        """
+        Ingest a document (blocking).
+
+        Returns the cleaned text length, the number of chunks stored and the
+        MinHash signature of the cleaned text (None without `minhash`).
+        Chunks are upserted under deterministic ids as they are embedded. If
+        a stage fails, every chunk stored under `document_id` is deleted
+        again, including chunks of an earlier, interrupted attempt.
+
+        Args:
+            progress: Called from the stage threads with a snapshot of the
+                current stage (the earliest one still running: "extracting",
+                "embedding" or "writing") and the pages_extracted,
+                chunks_embedded and chunks_written counters
+            minhash: Hash functions for the signature, computed while cleaning
+            gate: Called with the signature once the whole text is chunked
+                and before anything is embedded; raising aborts the ingestion
+                with nothing written. Needs `minhash`, and holds all chunks in
+                memory until it returns
+            content_hash: SHA-256 of the file; looks up and fills the artifact cache
+        """
+        stats = {"characters": 0, "stage": "extracting", "pages_extracted": 0, "chunks_embedded": 0, "chunks_written": 0, "signature": None}
+        hasher = minhash.hasher() if minhash is not None else None
+
+        def report(**changes):
+            # Each counter is only written by one stage thread
+            stats.update(changes)
+            if progress is not None:
+                progress({key: stats[key] for key in ("stage", "pages_extracted", "chunks_embedded", "chunks_written")})
+
+        batch_size = max(1, min(self.batch_size, self.chroma_store.max_batch_size))
+        cache_key = chunker_key(self.text_chunker) if self.artifact_cache is not None and content_hash else None
+        artifacts = self.artifact_cache.get(content_hash, cache_key) if cache_key else None
+        if artifacts is not None:
+            chunk_batches = self._cached_batches(artifacts, filename, document_id, batch_size, stats, report, minhash, gate)
+        else:
+            cache = (lambda artifacts: self.artifact_cache.put(content_hash, cache_key, artifacts)) if cache_key else None
+            chunk_batches = self._chunk_batches(source, filename, document_id, batch_size, stats, report, hasher, gate, cache)
+        batches = threaded(chunk_batches, self.queue_size, "ingest-chunk")
+        embedded = threaded(self._embed(batches, stats, report), self.queue_size, "ingest-embed")
+
+        written = 0
+        try:
+            for chunks, embeddings in embedded:
+                self.chroma_store.add_embeddings(
+                    texts=[chunk.text for chunk in chunks],
+                    embeddings=embeddings,
+                    metadatas=[chunk_metadata(chunk, filename, upload_date) for chunk in chunks],
+                    ids=[make_chunk_id(document_id, chunk.chunk_index) for chunk in chunks]
+                )
+                written += len(chunks)
+                report(chunks_written=written)
+            if artifacts is None:
+                # Streamed chunks were written before the total was known
+                self.chroma_store.update_metadata(
+                    [make_chunk_id(document_id, i) for i in range(written)],
+                    [{"total_chunks": written}] * written
+                )
+        except BaseException:
+            embedded.close()
+            # By metadata rather than by the ids counted here: a failed upsert may
+            # have stored part of its batch, and a resumed job may have written more
+            self.chroma_store.delete_where({"document_id": document_id})
+            raise
+
+        return stats["characters"], written, stats["signature"]
+
+    def _chunk_batches(self, source: FileSource, filename: str, document_id: str, batch_size: int, stats: dict, report: Callable, hasher: Optional[MinHasher] = None, gate: Optional[Callable[[np.ndarray], None]] = None, cache: Optional[Callable[[DocumentArtifacts], None]] = None) -> Iterator[List[TextChunk]]:
+        """
+        Clean and chunk pages as they are extracted, yielding batches of chunks with page numbers.
+
+        With a `gate`, batches are held back until the signature of the whole
+        text has passed it. With `cache`, the artifacts of the document are
+        handed to it once the whole text is chunked, unless the text grows
+        past `artifact_max_chars`; the collected artifacts are dropped then.
+        """
+        text_pieces = []  # Cleaned text, kept only for the cache
+        artifacts = DocumentArtifacts("")
+        caching = cache is not None
+        pages = threaded(self.document_processor.iter_pages(source, filename), self.queue_size, "ingest-extract")
+        page_numbers = []  # Page number of each non-empty page, in order
+        # Cleaned-text offset where each page starts, for assigning chunks to pages
+        page_starts = []
+        page_start_numbers = []
+
+        def raw_pieces() -> Iterator[str]:
+            # Non-empty pages joined by newlines, as in extract_text_with_page_info
+            for page_number, page_text in pages:
+                report(pages_extracted=stats["pages_extracted"] + 1)
+                if page_text.strip():
+                    page_numbers.append(page_number)
+                    yield page_text + "\n"
+            report(stage="embedding")
+
+        def cleaned_pieces() -> Iterator[str]:
+            for index, cleaned in enumerate(self.document_processor.clean_stream(raw_pieces())):
+                if cleaned and page_numbers[index] is not None:
+                    page_starts.append(stats["characters"])
+                    page_start_numbers.append(page_numbers[index])
+                stats["characters"] += len(cleaned)
+                if hasher is not None:
+                    hasher.update(cleaned)
+                if caching:
+                    text_pieces.append(cleaned)
+                    if stats["characters"] > self.artifact_max_chars:
+                        stop_caching()
+                yield cleaned
+
+        def stop_caching():
+            nonlocal caching, artifacts
+            caching = False
+            text_pieces.clear()
+            artifacts = None
+
+        batch = []
+        held = []  # Batches waiting for the gate
+        try:
+            for chunk in self.text_chunker.iter_chunks(cleaned_pieces(), document_id, filename):
+                if page_starts:
+                    # Page of the chunk midpoint; chunks never run past the text seen so far
+                    page_index = bisect_right(page_starts, (chunk.start_char + chunk.end_char) // 2) - 1
+                    if page_index >= 0:
+                        chunk.page_number = page_start_numbers[page_index]
+                if caching:
+                    artifacts.append(chunk)
+                batch.append(chunk)
+                if len(batch) == batch_size:
+                    if gate is None:
+                        yield batch
+                    else:
+                        held.append(batch)
+                    batch = []
+            if batch:
+                held.append(batch)
+            if caching:
+                artifacts.text = "".join(text_pieces)
+                cache(artifacts)
+            if hasher is not None:
+                stats["signature"] = hasher.digest()
+                if gate is not None:
+                    gate(stats["signature"])
+            yield from held
+        finally:
+            pages.close()
+
+    def _cached_batches(self, artifacts: DocumentArtifacts, filename: str, document_id: str, batch_size: int, stats: dict, report: Callable, minhash: Optional[MinHash] = None, gate: Optional[Callable[[np.ndarray], None]] = None) -> Iterator[List[TextChunk]]:
+        """Batches of a document's cached chunks; nothing is extracted, cleaned or chunked."""
+        stats["characters"] = len(artifacts.text)
+        report(stage="embedding")
+        if minhash is not None:
+            stats["signature"] = minhash.signature(artifacts.text)
+            if gate is not None:
+                gate(stats["signature"])
+        chunks = artifacts.chunks(document_id, filename)
+        for start in range(0, len(chunks), batch_size):
+            yield chunks[start:start + batch_size]
+
+    def _embed(self, batches: Iterable[List[TextChunk]], stats: dict, report: Callable) -> Iterator[Tuple[List[TextChunk], np.ndarray]]:
+        for batch in batches:
+            embeddings = self.chroma_store.embed_texts([chunk.text for chunk in batch])
+            report(chunks_embedded=stats["chunks_embedded"] + len(batch))
+            yield batch, embeddings
+        report(stage="writing")
@@ -0,0 +1,200 @@
+import asyncio
+import json
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional
+
+from fastapi import HTTPException, UploadFile
+
+from services.document_service import DocumentService
+from utils.job_store import JobRecord, JobStore
+from utils.upload_spool import spool_upload
+import config
+
+class JobService:
+    """
+    Background ingestion of uploaded documents.
+
+    Uploads are spooled to a persistent directory and recorded as jobs in
+    SQLite, then processed by a fixed number of worker tasks, so the upload
+    request returns as soon as the file is on disk. Jobs that were queued or
+    running when the service stopped are queued again on startup; since
+    chunk ids are derived from the job's document id, re-running a job
+    overwrites whatever it had already written.
+    """
+
+    def __init__(self, document_service: DocumentService, job_store: JobStore = None, workers: int = config.JOB_WORKERS, spool_dir: str = config.JOB_SPOOL_DIR, retention_hours: float = config.JOB_RETENTION_HOURS):
+        """
+        Args:
+            document_service: Service that ingests a spooled file
+            job_store: Persistent job records
+            workers: Number of jobs processed at the same time
+            spool_dir: Directory keeping uploads until their job finishes
+            retention_hours: How long finished jobs are kept
+        """
+        self.document_service = document_service
+        self.job_store = job_store or JobStore(storage_file=config.JOB_DB_PATH)
+        self.workers = workers
+        self.retention = timedelta(hours=retention_hours)
+        self.spool_dir = Path(spool_dir)
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        # Jobs not yet finished; finished jobs are read back from the store
+        self._active: Dict[str, JobRecord] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        """Start the workers and queue jobs left unfinished by a previous run."""
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._prune_periodically()))
+        resumed = 0
+        for job in self.job_store.unfinished():
+            if not Path(job.file_path).exists():
+                self._finish(job, "failed", error="Upload file is missing; upload the document again")
+                continue
+            self._reset(job)
+            self._enqueue(job)
+            resumed += 1
+        if resumed:
+            print(f"🔁 Resumed {resumed} unfinished ingestion jobs")
+
+    async def shutdown(self):
+        """Stop the workers; interrupted jobs stay unfinished and resume on the next start."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, file: UploadFile, force: bool = False) -> JobRecord:
+        """
+        Spool an upload and queue it for ingestion.
+        
+        Unless `force` is set, content that is already stored yields a job
+        that is completed right away with the existing document, and content
+        that is already queued or running (e.g. a retried upload) yields
+        that job.
+        """
+        self.document_service.validate_upload(file)
+        file_path, content_hash = await spool_upload(file, self.document_service.max_upload_bytes, directory=str(self.spool_dir))
+        if not force:
+            for job in self._active.values():
+                if job.content_hash == content_hash:
+                    file_path.unlink(missing_ok=True)
+                    return job
+        job = JobRecord(
+            job_id=str(uuid.uuid4()),
+            document_id=str(uuid.uuid4()),
+            document_name=file.filename,
+            file_path=str(file_path),
+            content_hash=content_hash,
+            force=force
+        )
+        existing = None if force else self.document_service.find_stored(content_hash)
+        if existing:
+            job.document_id = existing.document_id
+            self._finish(job, "completed", result=self.document_service.duplicate_response(existing).model_dump())
+            return job
+        try:
+            self.job_store.save(job)
+        except BaseException:
+            file_path.unlink(missing_ok=True)
+            raise
+        self._enqueue(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[JobRecord]:
+        return self._active.get(job_id) or self.job_store.get(job_id)
+
+    async def events(self, job_id: str, interval: float = 0.5) -> AsyncIterator[str]:
+        """
+        Server-sent events with the job's state, one per change.
+
+        Ends after the event that reports the job as completed or failed.
+        """
+        last = None
+        while True:
+            job = self.get(job_id)
+            if job is None:
+                return
+            data = job.to_dict()
+            snapshot = json.dumps(data, default=str)
+            if snapshot != last:
+                last = snapshot
+                yield f"event: {data['status']}\ndata: {snapshot}\n\n"
+            if job.status in ("completed", "failed"):
+                return
+            await asyncio.sleep(interval)
+
+    def _enqueue(self, job: JobRecord):
+        self._active[job.job_id] = job
+        self._queue.put_nowait(job.job_id)
+
+    def _reset(self, job: JobRecord):
+        job.status = job.stage = "queued"
+        job.pages_extracted = job.chunks_embedded = job.chunks_written = 0
+        job.updated_at = datetime.now()
+        self.job_store.save(job)
+
+    def _finish(self, job: JobRecord, status: str, result: dict = None, error: str = None):
+        job.status = job.stage = status
+        job.result = result
+        job.error = error
+        job.updated_at = datetime.now()
+        self.job_store.save(job)
+        self._active.pop(job.job_id, None)
+        Path(job.file_path).unlink(missing_ok=True)
+
+    def _progress(self, job: JobRecord, snapshot: dict):
+        # Called from pipeline threads; progress is only kept in memory
+        job.stage = snapshot["stage"]
+        job.pages_extracted = snapshot["pages_extracted"]
+        job.chunks_embedded = snapshot["chunks_embedded"]
+        job.chunks_written = snapshot["chunks_written"]
+        job.updated_at = datetime.now()
+
+    async def _prune_periodically(self, interval: float = 3600.0):
+        while True:
+            try:
+                pruned = self.job_store.prune(datetime.now() - self.retention)
+                if pruned:
+                    print(f"🧹 Deleted {pruned} finished ingestion jobs")
+            except Exception as e:
+                print(f"⚠️  Error pruning ingestion jobs: {e}")
+            await asyncio.sleep(interval)
+
+    def _public_error(self, job: JobRecord, error: Exception) -> str:
+        """
+        Failure reason shown to clients.
+
+        Client errors (4xx) are passed on; anything else is only logged, since
+        it may mention server paths such as the job's spool file.
+        """
+        if isinstance(error, HTTPException) and error.status_code < 500:
+            return str(error.detail).replace(job.file_path, job.document_name)
+        print(f"❌ Ingestion job {job.job_id} failed: {error.detail if isinstance(error, HTTPException) else error}")
+        return "Error processing document"
+
+    async def _worker(self):
+        while True:
+            job = self._active.get(await self._queue.get())
+            if job is None:
+                continue
+            job.status = "running"
+            job.updated_at = datetime.now()
+            self.job_store.save(job)
+            try:
+                response = await self.document_service.ingest_file(
+                    Path(job.file_path),
+                    job.document_name,
+                    job.document_id,
+                    progress=lambda snapshot, job=job: self._progress(job, snapshot),
+                    content_hash=job.content_hash,
+                    force=job.force
+                )
+                # A near-duplicate resolves to the stored document
+                job.document_id = response.document_id
+                self._finish(job, "completed", result=response.model_dump())
+            except Exception as e:
+                self._finish(job, "failed", error=self._public_error(job, e))
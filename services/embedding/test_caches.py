@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the query, embedding and artifact caches
+"""
+
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from utils.artifact_cache import ArtifactCache, DocumentArtifacts, chunker_key
+from utils.embedding_cache import EmbeddingCache
+from utils.query_cache import QueryEmbeddingCache
+from utils.text_chunker import TextChunker
+
+def test_query_cache():
+    cache = QueryEmbeddingCache(max_size=2, ttl_seconds=0)
+    vector = np.arange(4, dtype=np.float64)
+    cache.put("model", "What is  MMAP?", vector)
+    # Case and whitespace are normalized; vectors are stored as float32
+    cached = cache.get("model", "what is mmap?")
+    assert cached is not None and cached.dtype == np.float32 and (cached == vector).all()
+    assert cache.get("other-model", "what is mmap?") is None
+
+    # Least recently used entries go first
+    cache.put("model", "second", vector)
+    cache.get("model", "what is mmap?")
+    cache.put("model", "third", vector)
+    assert cache.get("model", "second") is None
+    assert cache.get("model", "what is mmap?") is not None
+    stats = cache.stats()
+    assert stats["size"] == 2 and stats["hits"] == 3 and stats["misses"] == 2
+
+def test_query_cache_expiry():
+    cache = QueryEmbeddingCache(max_size=10, ttl_seconds=0.05)
+    cache.put("model", "query", np.ones(4))
+    assert cache.get("model", "query") is not None
+    time.sleep(0.1)
+    assert cache.get("model", "query") is None
+    assert QueryEmbeddingCache(max_size=0).stats()["size"] == 0
+
+def test_embedding_cache():
+    with tempfile.TemporaryDirectory() as directory:
+        db_file = Path(directory) / "embedding_cache.db"
+        cache = EmbeddingCache(db_file=db_file)
+        texts = ["alpha", "beta", "gamma"]
+        vectors = np.random.RandomState(0).rand(3, 8).astype(np.float32)
+        cache.put_many("model", texts, vectors)
+
+        found = cache.get_many("model", ["beta", "delta", "alpha", "beta"])
+        assert sorted(found) == [0, 2, 3]
+        assert (found[0] == vectors[1]).all() and (found[2] == vectors[0]).all() and (found[3] == vectors[1]).all()
+        assert cache.get_many("other-model", texts) == {}
+
+        # Survives a restart, size accounting included
+        reopened = EmbeddingCache(db_file=db_file)
+        assert reopened.total_bytes == cache.total_bytes == 3 * 8 * 4
+        assert sorted(reopened.get_many("model", texts)) == [0, 1, 2]
+
+def test_embedding_cache_eviction():
+    with tempfile.TemporaryDirectory() as directory:
+        vector_bytes = 8 * 4
+        cache = EmbeddingCache(db_file=Path(directory) / "embedding_cache.db", max_bytes=3 * vector_bytes)
+        for i in range(3):
+            cache.put_many("model", [f"text {i}"], np.full((1, 8), i, dtype=np.float32))
+            time.sleep(0.01)
+        # Touch the oldest entry so the second one is evicted instead
+        cache.get_many("model", ["text 0"])
+        cache.put_many("model", ["text 3"], np.full((1, 8), 3, dtype=np.float32))
+        found = cache.get_many("model", [f"text {i}" for i in range(4)])
+        assert sorted(found) == [0, 2, 3]
+        assert cache.total_bytes == 3 * vector_bytes
+        assert cache.stats()["entries"] == 3
+
+def test_artifact_cache():
+    chunker = TextChunker(chunk_size=60, overlap_size=20)
+    text = "First sentence here. Second one follows. A third sentence ends it. And a fourth."
+    artifacts = DocumentArtifacts.from_chunks(text, chunker.create_chunks(text, "doc", "doc.txt"))
+    with tempfile.TemporaryDirectory() as directory:
+        db_file = Path(directory) / "artifact_cache.db"
+        cache = ArtifactCache(db_file=db_file)
+        key = chunker_key(chunker)
+        assert cache.get("hash", key) is None
+        cache.put("hash", key, artifacts)
+
+        cached = ArtifactCache(db_file=db_file).get("hash", key)
+        assert cached is not None and cached.text == text
+        expected = chunker.create_chunks(text, "other", "other.txt")
+        chunks = cached.chunks("other", "other.txt")
+        assert [(chunk.text, chunk.start_char, chunk.end_char, chunk.total_chunks) for chunk in chunks] == \
+            [(chunk.text, chunk.start_char, chunk.end_char, chunk.total_chunks) for chunk in expected]
+
+        # Other chunker settings do not reuse the entry
+        assert cache.get("hash", chunker_key(TextChunker(chunk_size=61, overlap_size=20))) is None
+        stats = cache.stats()
+        assert stats["entries"] == 1 and stats["hits"] == 0 and stats["misses"] == 2
+
+def test_artifact_cache_eviction():
+    artifacts = DocumentArtifacts("x" * 1000)
+    size = len(artifacts.to_bytes())
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ArtifactCache(db_file=Path(directory) / "artifact_cache.db", max_bytes=2 * size)
+        for content_hash in ("a", "b", "c"):
+            cache.put(content_hash, "key", artifacts)
+            time.sleep(0.01)
+        assert cache.get("a", "key") is None
+        assert cache.get("c", "key") is not None
+        assert cache.total_bytes == 2 * size
+        # Entries larger than the whole cache are not stored
+        small = ArtifactCache(db_file=Path(directory) / "small.db", max_bytes=1)
+        small.put("big", "key", artifacts)
+        assert small.get("big", "key") is None and small.total_bytes == 0
+
+def main():
+    print("🧪 Testing caches")
+    for test in (test_query_cache, test_query_cache_expiry, test_embedding_cache, test_embedding_cache_eviction, test_artifact_cache, test_artifact_cache_eviction):
+        test()
+        print(f"✅ {test.__name__}")
+
+if __name__ == "__main__":
+    main()
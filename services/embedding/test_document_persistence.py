@@ -48,7 +48,7 @@ def test_document_persistence():
         response = requests.get(f"{BASE_URL}/get-all")
         if response.status_code == 200:
             data = response.json()
-            print(f"📊 Total items in database: {data['count']}")
+            print(f"📊 Total items in database: {data['total']}")
         else:
             print("❌ Error getting all items")
             return False
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Test script to verify BM25 lexical search and reciprocal rank fusion
+"""
+
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+from vectordb.lexical_index import BM25Index, tokenize
+
+DOCUMENTS = {
+    "a": "The mmap syscall maps files into memory.",
+    "b": "Use read and write to copy a file; mmap is faster for large files.",
+    "c": "Garbage collection pauses in the JVM.",
+    "d": "Memory pressure triggers the OOM killer.",
+}
+
+class PagedCollection:
+    """Chroma-like collection answering paged `get` calls."""
+
+    def __init__(self, documents):
+        self.documents = documents
+
+    def get(self, ids=None, where=None, limit=None, offset=0, include=None):
+        if ids is None:
+            ids = list(self.documents)[offset:offset + limit]
+        else:
+            ids = [chunk_id for chunk_id in ids if chunk_id in self.documents]
+        return {
+            "ids": ids,
+            "documents": [self.documents[chunk_id] for chunk_id in ids],
+            "metadatas": [{"document_id": chunk_id} for chunk_id in ids],
+        }
+
+def new_index(directory) -> BM25Index:
+    return BM25Index(index_file=Path(directory) / "lexical_index.pkl")
+
+def test_tokenize():
+    assert tokenize("mmap(2) and O_DIRECT, 4096-byte pages") == ["mmap", "2", "and", "o_direct", "4096", "byte", "pages"]
+
+def test_bm25_ranking():
+    """Exact term matches rank first; rarer terms weigh more."""
+    with tempfile.TemporaryDirectory() as directory:
+        index = new_index(directory)
+        index.add(list(DOCUMENTS), list(DOCUMENTS.values()))
+        results = index.search("mmap memory", k=10)
+        ids = [chunk_id for chunk_id, _ in results]
+        assert ids[0] == "a", results
+        assert set(ids) == {"a", "b", "d"}
+        assert all(score > 0 for _, score in results)
+        assert [chunk_id for chunk_id, _ in index.search("mmap memory", k=1)] == ["a"]
+        assert index.search("kubernetes", k=5) == []
+
+def test_bm25_remove_and_replace():
+    with tempfile.TemporaryDirectory() as directory:
+        index = new_index(directory)
+        index.add(list(DOCUMENTS), list(DOCUMENTS.values()))
+        index.remove(["a", "unknown"])
+        assert len(index) == 3
+        assert "a" not in [chunk_id for chunk_id, _ in index.search("mmap", k=10)]
+        # Re-adding an id replaces its text
+        index.add(["c"], ["mmap everywhere"])
+        assert [chunk_id for chunk_id, _ in index.search("jvm", k=10)] == []
+        assert "c" in [chunk_id for chunk_id, _ in index.search("mmap", k=10)]
+        index.compact()
+        assert len(index) == 3
+        assert {chunk_id for chunk_id, _ in index.search("mmap", k=10)} == {"b", "c"}
+
+def test_bm25_save_and_load():
+    with tempfile.TemporaryDirectory() as directory:
+        index = new_index(directory)
+        index.add(list(DOCUMENTS), list(DOCUMENTS.values()))
+        index.remove(["c"])
+        index.save()
+        loaded = new_index(directory)
+        assert len(loaded) == 3
+        assert loaded.search("mmap memory", k=10) == index.search("mmap memory", k=10)
+
+def test_bm25_rebuild():
+    """Rebuilding from the collection replaces stale entries."""
+    with tempfile.TemporaryDirectory() as directory:
+        index = new_index(directory)
+        index.add(["stale"], ["mmap mmap mmap"])
+        index.rebuild(PagedCollection(DOCUMENTS), batch_size=3)
+        assert len(index) == len(DOCUMENTS)
+        assert "stale" not in [chunk_id for chunk_id, _ in index.search("mmap", k=10)]
+
+def test_reciprocal_rank_fusion():
+    """Hybrid scores are sum(1 / (rrf_k + rank)) over the vector and lexical rankings."""
+    from vectordb.chroma_store import ChromaStore
+
+    with tempfile.TemporaryDirectory() as directory:
+        lexical_index = new_index(directory)
+        lexical_index.add(list(DOCUMENTS), list(DOCUMENTS.values()))
+        vector_ranking = ["d", "a", "c"]
+
+        def search(query, k, where=None):
+            return {
+                "ids": [vector_ranking],
+                "documents": [[DOCUMENTS[chunk_id] for chunk_id in vector_ranking]],
+                "metadatas": [[{"document_id": chunk_id} for chunk_id in vector_ranking]],
+                "distances": [[0.1, 0.2, 0.3]],
+            }
+
+        store = SimpleNamespace(search=search, lexical_index=lexical_index, collection=PagedCollection(DOCUMENTS))
+        results = ChromaStore.hybrid_search(store, "mmap memory", k=4, rrf_k=60)
+        lexical_ranking = [chunk_id for chunk_id, _ in lexical_index.search("mmap memory", k=20)]
+
+        expected = {}
+        for ranking in (vector_ranking, lexical_ranking):
+            for rank, chunk_id in enumerate(ranking):
+                expected[chunk_id] = expected.get(chunk_id, 0.0) + 1.0 / (60 + rank + 1)
+        assert results["ids"][0] == sorted(expected, key=lambda chunk_id: -expected[chunk_id])[:4]
+        for chunk_id, score in zip(results["ids"][0], results["scores"][0]):
+            assert abs(score - expected[chunk_id]) < 1e-9
+        # Found in both rankings, so ahead of anything found by only one
+        assert results["ids"][0][0] in set(vector_ranking) & set(lexical_ranking)
+        # Lexical-only hits are fetched from the collection and have no distance
+        for chunk_id, document, distance in zip(results["ids"][0], results["documents"][0], results["distances"][0]):
+            assert document == DOCUMENTS[chunk_id]
+            assert (distance is None) == (chunk_id not in vector_ranking)
+
+        lexical = ChromaStore.hybrid_search(store, "mmap memory", k=4, mode="lexical")
+        assert lexical["ids"][0] == lexical_ranking[:4]
+
+def main():
+    print("🧪 Testing lexical and hybrid search")
+    for test in (test_tokenize, test_bm25_ranking, test_bm25_remove_and_replace, test_bm25_save_and_load, test_bm25_rebuild, test_reciprocal_rank_fusion):
+        test()
+        print(f"✅ {test.__name__}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test script to verify MinHash signatures and the LSH near-duplicate index
+"""
+
+import random
+import tempfile
+from pathlib import Path
+
+from utils.metadata_storage import MetadataStorage
+from utils.minhash import MinHash, NearDuplicateIndex, jaccard, lsh_bands
+
+WORDS = [f"word{i}" for i in range(2000)]
+
+def random_text(rng: random.Random, length: int = 600) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(length))
+
+def edit(rng: random.Random, text: str, changes: int) -> str:
+    words = text.split()
+    for _ in range(changes):
+        words[rng.randrange(len(words))] = rng.choice(WORDS)
+    return " ".join(words)
+
+def new_storage(directory) -> MetadataStorage:
+    directory = Path(directory)
+    return MetadataStorage(storage_file=directory / "metadata.db", legacy_json_file=directory / "metadata.json")
+
+def test_signature_is_deterministic():
+    text = random_text(random.Random(0))
+    assert (MinHash().signature(text) == MinHash().signature(text)).all()
+    assert (MinHash().signature(text) == MinHash().signature(text.upper())).all()
+
+def test_incremental_matches_whole_text():
+    """Feeding a text in arbitrary pieces gives the signature of the whole text."""
+    rng = random.Random(1)
+    family = MinHash()
+    for text in (random_text(rng), "too short", "a b c d e f"):
+        hasher = family.hasher()
+        cuts = sorted(rng.randrange(len(text)) for _ in range(10))
+        for start, end in zip([0] + cuts, cuts + [len(text)]):
+            hasher.update(text[start:end])
+        assert (hasher.digest() == family.signature(text)).all(), text
+
+def test_similarity_estimate():
+    rng = random.Random(2)
+    family = MinHash(num_perm=256)
+    text = random_text(rng)
+    assert jaccard(family.signature(text), family.signature(text)) == 1.0
+    assert jaccard(family.signature(text), family.signature(edit(rng, text, 3))) > 0.8
+    assert jaccard(family.signature(text), family.signature(random_text(rng))) < 0.1
+
+def test_lsh_bands():
+    for num_perm, threshold in ((128, 0.8), (128, 0.5), (256, 0.9)):
+        bands, rows = lsh_bands(num_perm, threshold)
+        assert bands * rows == num_perm
+        assert (1 / bands) ** (1 / rows) <= threshold
+
+def test_near_duplicate_index():
+    rng = random.Random(3)
+    family = MinHash()
+    original = random_text(rng)
+    with tempfile.TemporaryDirectory() as directory:
+        storage = new_storage(directory)
+        index = NearDuplicateIndex(storage, family, threshold=0.8)
+        index.add("original", family.signature(original))
+        index.add("other", family.signature(random_text(rng)))
+
+        matches = index.find(family.signature(edit(rng, original, 2)))
+        assert [document_id for document_id, _ in matches] == ["original"], matches
+        assert matches[0][1] >= 0.8
+        assert index.find(family.signature(random_text(rng))) == []
+
+        # Signatures are reloaded from the metadata store
+        reloaded = NearDuplicateIndex(new_storage(directory), family, threshold=0.8)
+        assert len(reloaded) == 2
+        assert [document_id for document_id, _ in reloaded.find(family.signature(original))] == ["original"]
+
+        index.remove("original")
+        assert index.find(family.signature(original)) == []
+        index.clear()
+        assert len(index) == 0
+
+def main():
+    print("🧪 Testing MinHash near-duplicate detection")
+    for test in (test_signature_is_deterministic, test_incremental_matches_whole_text, test_similarity_estimate, test_lsh_bands, test_near_duplicate_index):
+        test()
+        print(f"✅ {test.__name__}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test script to verify chunk packing, token chunking and streaming chunking
+"""
+
+import random
+import re
+
+from utils import text_chunker
+from utils.text_chunker import TextChunker
+
+WORDS = ["alpha", "beta", "gamma", "delta", "epsilon", "zeta", "eta", "theta"]
+
+class WhitespaceTokenizer:
+    """Fast-tokenizer stand-in: one token per whitespace-separated word."""
+
+    def __call__(self, texts, **kwargs):
+        return {"offset_mapping": [[match.span() for match in re.finditer(r"\S+", text)] for text in texts]}
+
+def random_text(rng: random.Random, sentences: int, max_words: int = 25) -> str:
+    return " ".join(
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, max_words))) + "."
+        for _ in range(sentences)
+    )
+
+def token_chunker(**kwargs) -> TextChunker:
+    text_chunker._tokenizers["whitespace"] = WhitespaceTokenizer()
+    return TextChunker(mode="tokens", tokenizer_name="whitespace", **kwargs)
+
+def test_token_chunks_within_budget():
+    """Chunks never exceed the token target, overlap included."""
+    chunker = TextChunker(mode="tokens", tokenizer_name="unused", token_target=510, token_overlap=48)
+    rng = random.Random(0)
+    for _ in range(200):
+        # Token counts per sentence, as prefix sums like _group_spans builds them
+        # Mostly short sentences, some close to the target (longer ones are split before packing)
+        counts = [rng.choice((rng.randint(1, 40), rng.randint(400, 510))) for _ in range(rng.randint(1, 200))]
+        prefix = [0]
+        for count in counts:
+            prefix.append(prefix[-1] + count)
+        starts, ends = prefix[:-1], prefix[1:]
+        groups = chunker._pack(starts, ends, chunker.token_target, chunker.token_overlap)
+        for first, last in groups:
+            assert ends[last] - starts[first] <= chunker.token_target, (first, last, ends[last] - starts[first])
+        # Every sentence is covered, in order
+        assert groups[0][0] == 0 and groups[-1][1] == len(counts) - 1
+        for (_, last), (first, _) in zip(groups, groups[1:]):
+            assert first <= last + 1
+
+def test_char_chunks_within_budget():
+    """Character chunks stay within chunk_size unless a single sentence is longer."""
+    chunker = TextChunker(chunk_size=200, overlap_size=150)
+    rng = random.Random(1)
+    words = ["alpha", "beta", "gamma", "delta", "epsilon"]
+    text = " ".join(
+        " ".join(rng.choice(words) for _ in range(rng.randint(3, 25))) + "."
+        for _ in range(300)
+    )
+    for chunk in chunker.create_chunks(text, "doc", "doc.txt"):
+        assert chunk.text == text[chunk.start_char:chunk.end_char]
+        assert len(chunk.text) <= chunker.chunk_size or len(chunker.split_into_sentences(chunk.text)) == 1
+
+def test_token_chunking():
+    """Token chunks fit the target, overlap, and cut over-long sentences at token boundaries."""
+    chunker = token_chunker(token_target=40, token_overlap=10)
+    text = random_text(random.Random(2), 100) + " " + " ".join(["long"] * 100) + "."
+    chunks = chunker.create_chunks(text, "doc", "doc.txt")
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert chunk.text == text[chunk.start_char:chunk.end_char]
+        assert len(chunk.text.split()) <= 40, len(chunk.text.split())
+        assert chunk.total_chunks == len(chunks)
+    # Consecutive chunks share their boundary sentences
+    assert any(next_chunk.start_char < chunk.end_char for chunk, next_chunk in zip(chunks, chunks[1:]))
+    # Every word is covered
+    covered = set()
+    for chunk in chunks:
+        covered.update(range(chunk.start_char, chunk.end_char))
+    assert all(i in covered for i, char in enumerate(text) if not char.isspace())
+    # The model input limit caps the target, leaving room for the special tokens
+    assert token_chunker(token_target=1000, max_tokens=512).token_target == 510
+
+def test_iter_chunks_matches_create_chunks():
+    """Streaming the text in pieces gives the same chunks as chunking it at once."""
+    rng = random.Random(3)
+    for chunker in (TextChunker(chunk_size=300, overlap_size=80), token_chunker(token_target=60, token_overlap=15)):
+        for _ in range(20):
+            text = random_text(rng, rng.randint(1, 120))
+            cuts = sorted(rng.randrange(len(text)) for _ in range(rng.randint(0, 30)))
+            pieces = [text[start:end] for start, end in zip([0] + cuts, cuts + [len(text)])]
+            expected = chunker.create_chunks(text, "doc", "doc.txt")
+            streamed = list(chunker.iter_chunks(pieces, "doc", "doc.txt"))
+            assert [(chunk.text, chunk.start_char, chunk.end_char, chunk.chunk_index) for chunk in streamed] == \
+                [(chunk.text, chunk.start_char, chunk.end_char, chunk.chunk_index) for chunk in expected]
+    assert list(TextChunker().iter_chunks(["", "  "], "doc", "doc.txt")) == []
+    # Text without sentence boundaries, like unpunctuated OCR output, in many small pieces
+    text = " ".join(rng.choice(WORDS) for _ in range(20000))
+    pieces = [text[start:start + 50] for start in range(0, len(text), 50)]
+    for chunker in (TextChunker(chunk_size=300, overlap_size=80), token_chunker(token_target=60, token_overlap=15)):
+        streamed = list(chunker.iter_chunks(pieces, "doc", "doc.txt"))
+        assert [chunk.text for chunk in streamed] == [chunk.text for chunk in chunker.create_chunks(text, "doc", "doc.txt")]
+
+def main():
+    print("🧪 Testing chunking")
+    for test in (test_token_chunks_within_budget, test_char_chunks_within_budget, test_token_chunking, test_iter_chunks_matches_create_chunks):
+        test()
+        print(f"✅ {test.__name__}")
+
+if __name__ == "__main__":
+    main()
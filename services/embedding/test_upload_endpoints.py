@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the bulk upload, job, batch search and document filter endpoints
+"""
+
+import io
+import json
+import time
+import uuid
+import zipfile
+from datetime import datetime, timedelta
+
+import requests
+from docx import Document
+
+BASE_URL = "http://localhost:8000"
+DOCX_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+def make_docx(paragraphs) -> bytes:
+    """A .docx file with the given paragraphs."""
+    document = Document()
+    for paragraph in paragraphs:
+        document.add_paragraph(paragraph)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+def unique_paragraphs(topic: str, count: int = 20):
+    """Text no earlier run has uploaded, so it is never a duplicate."""
+    marker = uuid.uuid4().hex
+    return [f"{topic} paragraph {i} about {marker}. The {topic} subsystem handles request {i} carefully." for i in range(count)]
+
+def wait_for_job(job_id: str, timeout: float = 120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = requests.get(f"{BASE_URL}/jobs/{job_id}").json()
+        if job["status"] in ("completed", "failed"):
+            return job
+        time.sleep(0.5)
+    return None
+
+def test_upload_documents():
+    """Upload two files and a ZIP archive in one request; the response lists every document."""
+    try:
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w") as zf:
+            zf.writestr("inner/zipped.docx", make_docx(unique_paragraphs("archive")))
+            zf.writestr("notes.txt", "not a supported document")
+        files = [
+            ("files", ("first.docx", make_docx(unique_paragraphs("scheduler")), DOCX_TYPE)),
+            ("files", ("second.docx", make_docx(unique_paragraphs("allocator")), DOCX_TYPE)),
+            ("files", ("bundle.zip", archive.getvalue(), "application/zip")),
+        ]
+        response = requests.post(f"{BASE_URL}/upload-documents", files=files)
+        print(f"Bulk upload: {response.status_code}")
+        data = response.json()
+        print(f"Response: {json.dumps(data, indent=2)}")
+        if response.status_code != 200:
+            return False
+        by_name = {item["document_name"]: item for item in data["documents"]}
+        stored = [by_name.get(name) for name in ("first.docx", "second.docx", "zipped.docx")]
+        return (
+            all(item and item["success"] and item["chunks_created"] > 0 for item in stored)
+            and by_name["zipped.docx"]["archive"] == "bundle.zip"
+            and not by_name["notes.txt"]["success"] and by_name["notes.txt"]["error"]
+            and data["documents_created"] == 3
+            and data["chunks_created"] == sum(item["chunks_created"] for item in stored)
+        )
+    except Exception as e:
+        print(f"Bulk upload test failed: {e}")
+        return False
+
+def test_job_status():
+    """An upload returns 202 with a job that completes with the document's result."""
+    try:
+        content = make_docx(unique_paragraphs("journal"))
+        response = requests.post(f"{BASE_URL}/upload-document", files={"file": ("job.docx", content, DOCX_TYPE)})
+        print(f"Job submit: {response.status_code}")
+        if response.status_code != 202:
+            return False
+        job = response.json()
+        job = wait_for_job(job["job_id"])
+        print(f"Job: {json.dumps(job, indent=2)}")
+        if not job or job["status"] != "completed":
+            return False
+        result = job["result"]
+        if not (result["success"] and result["chunks_created"] == job["chunks_written"] > 0 and result["document_id"] == job["document_id"]):
+            return False
+
+        # The same content again is a duplicate of the stored document
+        again = wait_for_job(requests.post(f"{BASE_URL}/upload-document", files={"file": ("copy.docx", content, DOCX_TYPE)}).json()["job_id"])
+        if not (again and again["result"]["duplicate"] and again["result"]["document_id"] == job["document_id"]):
+            return False
+
+        missing = requests.get(f"{BASE_URL}/jobs/{uuid.uuid4().hex}")
+        return missing.status_code == 404
+    except Exception as e:
+        print(f"Job status test failed: {e}")
+        return False
+
+def test_job_events():
+    """Job progress streams as server-sent events ending with the completed state."""
+    try:
+        content = make_docx(unique_paragraphs("events"))
+        job = requests.post(f"{BASE_URL}/upload-document", files={"file": ("events.docx", content, DOCX_TYPE)}).json()
+        events = []
+        with requests.get(f"{BASE_URL}/jobs/{job['job_id']}/events", stream=True, timeout=120) as response:
+            print(f"Job events: {response.status_code} {response.headers.get('content-type')}")
+            if response.status_code != 200 or not response.headers.get("content-type", "").startswith("text/event-stream"):
+                return False
+            event = {}
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith("event: "):
+                    event["event"] = line[len("event: "):]
+                elif line.startswith("data: "):
+                    event["data"] = json.loads(line[len("data: "):])
+                elif not line and event:
+                    events.append(event)
+                    event = {}
+        print(f"Events: {[event['event'] for event in events]}")
+        return (
+            len(events) > 0
+            and all(event["event"] == event["data"]["status"] for event in events)
+            and events[-1]["event"] == "completed"
+            and events[-1]["data"]["result"]["success"]
+            and requests.get(f"{BASE_URL}/jobs/{uuid.uuid4().hex}/events").status_code == 404
+        )
+    except Exception as e:
+        print(f"Job events test failed: {e}")
+        return False
+
+def test_search_batch():
+    """Batched searches return one result list per query, each honoring its own filter and k."""
+    try:
+        paragraphs = unique_paragraphs("batching")
+        upload = requests.post(f"{BASE_URL}/upload-document", params={"wait": "true"},
+                               files={"file": ("batch.docx", make_docx(paragraphs), DOCX_TYPE)}).json()
+        document_id = upload["document_id"]
+        queries = [
+            {"query": "batching subsystem", "k": 2, "document_id": document_id},
+            {"query": "batching subsystem", "k": 3, "document_ids": [document_id], "mode": "hybrid"},
+            {"query": paragraphs[0], "k": 1, "mode": "lexical", "document_id": document_id},
+            {"query": "anything at all", "k": 4},
+        ]
+        response = requests.post(f"{BASE_URL}/search-batch", json={"queries": queries})
+        print(f"Search batch: {response.status_code}")
+        data = response.json()
+        print(f"Response: {json.dumps(data, indent=2)[:2000]}")
+        if response.status_code != 200 or data["total_queries"] != len(queries):
+            return False
+        for query, result in zip(queries, data["results"]):
+            if result["query"] != query["query"] or result["total_results"] > query["k"]:
+                return False
+        # The first three are filtered to the uploaded document
+        for result in data["results"][:3]:
+            if not result["total_results"] or any(hit["document_id"] != document_id for hit in result["results"]):
+                return False
+
+        empty = requests.post(f"{BASE_URL}/search-batch", json={"queries": []}).json()
+        return empty == {"results": [], "total_queries": 0}
+    except Exception as e:
+        print(f"Search batch test failed: {e}")
+        return False
+
+def test_document_filters():
+    """GET /documents narrows the list by file type, name and upload time."""
+    try:
+        before_upload = datetime.now() - timedelta(seconds=1)
+        name = f"filters-{uuid.uuid4().hex}.docx"
+        upload = requests.post(f"{BASE_URL}/upload-document", params={"wait": "true"},
+                               files={"file": (name, make_docx(unique_paragraphs("filters")), DOCX_TYPE)}).json()
+        document_id = upload["document_id"]
+
+        def listed(**params):
+            response = requests.get(f"{BASE_URL}/documents", params=params)
+            data = response.json()
+            assert response.status_code == 200 and data["total_count"] == len(data["documents"])
+            return [document["document_id"] for document in data["documents"]]
+
+        checks = {
+            "by name": listed(document_name=name) == [document_id],
+            "by file type": document_id in listed(file_type="docx") and document_id not in listed(file_type="pdf"),
+            "uploaded after": document_id in listed(uploaded_after=before_upload.isoformat()),
+            "uploaded before": document_id not in listed(uploaded_before=before_upload.isoformat()),
+            "combined": listed(document_name=name, file_type="pptx") == [],
+        }
+        print(f"Document filters: {checks}")
+        return all(checks.values())
+    except Exception as e:
+        print(f"Document filters test failed: {e}")
+        return False
+
+def test_reupload_after_delete_all():
+    """After /delete-all, content uploaded before is stored again rather than reported as a duplicate."""
+    try:
+        content = make_docx(unique_paragraphs("reset"))
+        first = requests.post(f"{BASE_URL}/upload-document", params={"wait": "true"}, files={"file": ("reset.docx", content, DOCX_TYPE)}).json()
+        if requests.delete(f"{BASE_URL}/delete-all").status_code != 200:
+            return False
+        if requests.get(f"{BASE_URL}/documents").json()["total_count"] != 0:
+            return False
+        second = requests.post(f"{BASE_URL}/upload-document", params={"wait": "true"}, files={"file": ("reset.docx", content, DOCX_TYPE)}).json()
+        print(f"Re-upload after reset: {json.dumps(second, indent=2)}")
+        chunks = requests.get(f"{BASE_URL}/documents/{second['document_id']}/chunks").json()
+        return (
+            first["chunks_created"] > 0
+            and not second["duplicate"]
+            and second["near_duplicates"] == []
+            and len(chunks) == second["chunks_created"] > 0
+        )
+    except Exception as e:
+        print(f"Re-upload test failed: {e}")
+        return False
+
+def main():
+    print("🧪 Testing Upload, Job and Batch Search Endpoints")
+    print("=" * 50)
+
+    try:
+        requests.get(f"{BASE_URL}/")
+    except Exception:
+        print("❌ Service is not running. Please start the service first:")
+        print("   cd services/embedding")
+        print("   python run_server.py")
+        return
+
+    # The last test clears the collection
+    tests = [
+        ("Bulk upload", test_upload_documents),
+        ("Job status", test_job_status),
+        ("Job events", test_job_events),
+        ("Search batch", test_search_batch),
+        ("Document filters", test_document_filters),
+        ("Re-upload after delete-all", test_reupload_after_delete_all),
+    ]
+    results = []
+    for i, (name, test) in enumerate(tests, 1):
+        print(f"\n{i}. Testing {name.lower()}...")
+        results.append((name, test()))
+
+    print("\n" + "=" * 50)
+    print("📊 Test Results:")
+    for name, passed in results:
+        print(f"   {name}: {'✅' if passed else '❌'}")
+
+    all_passed = all(passed for _, passed in results)
+    print(f"\n🎯 Overall: {'✅ All tests passed!' if all_passed else '❌ Some tests failed'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Persistent cache of cleaned text and chunks per uploaded file, backed by SQLite
+"""
+
+import json
+import marshal
+import zlib
+from array import array
+from typing import List, Optional
+
+from utils.sqlite_cache import SQLiteLRUCache
+from utils.text_chunker import TextChunker, TextChunk
+
+# Bump when extraction, cleaning or the stored format change what a cached entry holds
+ARTIFACT_VERSION = 1
+
+def chunker_key(text_chunker: TextChunker) -> str:
+    """Cache key part for the chunker settings; entries made with other settings are not reused."""
+    return json.dumps({
+        "version": ARTIFACT_VERSION,
+        "mode": text_chunker.mode,
+        "chunk_size": text_chunker.chunk_size,
+        "overlap_size": text_chunker.overlap_size,
+        "tokenizer_name": text_chunker.tokenizer_name,
+        "token_target": text_chunker.token_target,
+        "token_overlap": text_chunker.token_overlap
+    }, sort_keys=True)
+
+class DocumentArtifacts:
+    """
+    Cleaned text of a document and its chunks as spans of that text.
+
+    Chunk text is always a slice of the cleaned text, so chunks are kept as
+    start/end offsets and page numbers (-1 for none) in int arrays instead
+    of copies of their text.
+    """
+
+    __slots__ = ("text", "starts", "ends", "pages")
+
+    def __init__(self, text: str, starts: array = None, ends: array = None, pages: array = None):
+        self.text = text
+        self.starts = starts if starts is not None else array('i')
+        self.ends = ends if ends is not None else array('i')
+        self.pages = pages if pages is not None else array('i')
+
+    @classmethod
+    def from_chunks(cls, text: str, chunks: List[TextChunk]) -> "DocumentArtifacts":
+        artifacts = cls(text)
+        for chunk in chunks:
+            artifacts.append(chunk)
+        return artifacts
+
+    def append(self, chunk: TextChunk):
+        self.starts.append(chunk.start_char)
+        self.ends.append(chunk.end_char)
+        self.pages.append(-1 if chunk.page_number is None else chunk.page_number)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def chunks(self, document_id: str, document_name: str) -> List[TextChunk]:
+        """The chunks of the document, under the given id and name."""
+        return [
+            TextChunk(
+                text=self.text[start:end],
+                chunk_index=i,
+                total_chunks=len(self.starts),
+                document_id=document_id,
+                document_name=document_name,
+                start_char=start,
+                end_char=end,
+                page_number=None if page < 0 else page
+            )
+            for i, (start, end, page) in enumerate(zip(self.starts, self.ends, self.pages))
+        ]
+
+    def to_bytes(self) -> bytes:
+        return zlib.compress(marshal.dumps((self.text, self.starts.tobytes(), self.ends.tobytes(), self.pages.tobytes())))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "DocumentArtifacts":
+        text, starts, ends, pages = marshal.loads(zlib.decompress(data))
+        return cls(text, array('i', starts), array('i', ends), array('i', pages))
+
+class ArtifactCache(SQLiteLRUCache):
+    """
+    On-disk cache of document artifacts keyed by (sha256 of the file, chunker settings).
+
+    Lets a file that was previewed with /chunk-document, or uploaded before,
+    skip extraction, cleaning and chunking. Entries are zlib-compressed
+    blobs in a single SQLite file, so the cache survives restarts. When the
+    total size exceeds `max_bytes` the least recently used entries are
+    evicted.
+    """
+
+    TABLE = "artifacts"
+    KEY_COLUMNS = ("content_hash", "chunker")
+    VALUE_COLUMN = "data"
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS artifacts (
+            content_hash TEXT NOT NULL,
+            chunker TEXT NOT NULL,
+            data BLOB NOT NULL,
+            last_access REAL NOT NULL,
+            PRIMARY KEY (content_hash, chunker)
+        ) WITHOUT ROWID
+    """
+    # Entries are whole documents, far larger than an embedding
+    EVICT_BATCH = 64
+
+    def __init__(self, db_file="./artifact_cache.db", max_bytes: int = 512 * 1024 ** 2):
+        super().__init__(db_file, max_bytes)
+
+    def get(self, content_hash: str, chunker: str) -> Optional[DocumentArtifacts]:
+        """Artifacts of a file processed with the same chunker settings, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM artifacts WHERE content_hash = ? AND chunker = ?",
+                (content_hash, chunker)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._touch([(content_hash, chunker)])
+            self._conn.commit()
+            self.hits += 1
+        return DocumentArtifacts.from_bytes(row[0])
+
+    def put(self, content_hash: str, chunker: str, artifacts: DocumentArtifacts):
+        """Store the artifacts of a file and evict old entries if over budget."""
+        data = artifacts.to_bytes()
+        if len(data) > self.max_bytes:
+            return
+        self._store([((content_hash, chunker), data)])
@@ -0,0 +1,149 @@
+import bisect
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from utils.metadata_storage import MetadataStorage
+
+class DocumentRecord:
+    """Metadata of one uploaded document."""
+
+    __slots__ = ("document_id", "document_name", "upload_date", "total_chunks", "total_characters", "file_type", "content_hash")
+
+    def __init__(self, document_id: str, document_name: str, upload_date: datetime, total_chunks: int, total_characters: int, file_type: str, content_hash: str = None):
+        self.document_id = document_id
+        self.document_name = document_name
+        self.upload_date = upload_date
+        self.total_chunks = total_chunks
+        self.total_characters = total_characters
+        self.file_type = file_type
+        self.content_hash = content_hash  # SHA-256 of the uploaded file
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DocumentRecord":
+        upload_date = data["upload_date"]
+        if isinstance(upload_date, str):
+            upload_date = datetime.fromisoformat(upload_date)
+        return cls(
+            document_id=data["document_id"],
+            document_name=data["document_name"],
+            upload_date=upload_date,
+            total_chunks=data["total_chunks"],
+            total_characters=data["total_characters"],
+            file_type=data["file_type"],
+            content_hash=data.get("content_hash")
+        )
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+class DocumentIndex:
+    """
+    Single in-memory index of document metadata.
+
+    Records are written through to the SQLite `MetadataStorage` and kept in
+    memory with secondary indexes on file type, document name and upload
+    date, so listings and lookups never scan the store or the vector index.
+    """
+
+    def __init__(self, storage: MetadataStorage):
+        self.storage = storage
+        self._lock = threading.RLock()
+        self._records: Dict[str, DocumentRecord] = {}
+        self._by_file_type: Dict[str, Set[str]] = {}
+        self._by_name: Dict[str, Set[str]] = {}
+        self._by_date: List[Tuple[datetime, str]] = []
+        self._by_hash: Dict[str, Set[str]] = {}
+        for data in storage.get_all_documents():
+            self._index(DocumentRecord.from_dict(data))
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, document_id: str) -> bool:
+        return document_id in self._records
+
+    def get(self, document_id: str) -> Optional[DocumentRecord]:
+        return self._records.get(document_id)
+
+    def add(self, record: DocumentRecord):
+        """Persist a record and add it to the in-memory indexes."""
+        with self._lock:
+            self.storage.add_document(
+                record.document_id,
+                record.document_name,
+                record.total_chunks,
+                record.total_characters,
+                record.file_type,
+                upload_date=record.upload_date,
+                content_hash=record.content_hash
+            )
+            if record.document_id in self._records:
+                self._unindex(record.document_id)
+            self._index(record)
+
+    def remove(self, document_id: str) -> bool:
+        """Delete a record from the store and the in-memory indexes."""
+        with self._lock:
+            if document_id not in self._records:
+                return False
+            self.storage.delete_document(document_id)
+            self._unindex(document_id)
+            return True
+
+    def clear(self):
+        """Delete all records from the store and the in-memory indexes."""
+        with self._lock:
+            self.storage.clear_all()
+            self._records.clear()
+            self._by_file_type.clear()
+            self._by_name.clear()
+            self._by_date.clear()
+            self._by_hash.clear()
+
+    def find_by_hash(self, content_hash: str) -> Optional[DocumentRecord]:
+        """Oldest document whose uploaded file had this content hash."""
+        with self._lock:
+            ids = self._by_hash.get(content_hash)
+            if not ids:
+                return None
+            return min((self._records[document_id] for document_id in ids), key=lambda record: record.upload_date)
+
+    def find(self, file_type: str = None, document_name: str = None, uploaded_after: datetime = None, uploaded_before: datetime = None) -> List[DocumentRecord]:
+        """Records matching all given constraints, oldest upload first."""
+        # Upload dates are stored as naive local times
+        if uploaded_after and uploaded_after.tzinfo:
+            uploaded_after = uploaded_after.astimezone().replace(tzinfo=None)
+        if uploaded_before and uploaded_before.tzinfo:
+            uploaded_before = uploaded_before.astimezone().replace(tzinfo=None)
+        with self._lock:
+            lo = bisect.bisect_left(self._by_date, (uploaded_after,)) if uploaded_after else 0
+            hi = bisect.bisect_right(self._by_date, (uploaded_before, "\uffff")) if uploaded_before else len(self._by_date)
+            candidates = [document_id for _, document_id in self._by_date[lo:hi]]
+            if file_type is not None:
+                allowed = self._by_file_type.get(file_type.lower().lstrip("."), set())
+                candidates = [document_id for document_id in candidates if document_id in allowed]
+            if document_name is not None:
+                allowed = self._by_name.get(document_name, set())
+                candidates = [document_id for document_id in candidates if document_id in allowed]
+            return [self._records[document_id] for document_id in candidates]
+
+    def _index(self, record: DocumentRecord):
+        self._records[record.document_id] = record
+        self._by_file_type.setdefault(record.file_type, set()).add(record.document_id)
+        self._by_name.setdefault(record.document_name, set()).add(record.document_id)
+        bisect.insort(self._by_date, (record.upload_date, record.document_id))
+        if record.content_hash:
+            self._by_hash.setdefault(record.content_hash, set()).add(record.document_id)
+
+    def _unindex(self, document_id: str):
+        record = self._records.pop(document_id)
+        for index, key in ((self._by_file_type, record.file_type), (self._by_name, record.document_name), (self._by_hash, record.content_hash)):
+            ids = index.get(key)
+            if ids is not None:
+                ids.discard(document_id)
+                if not ids:
+                    del index[key]
+        position = bisect.bisect_left(self._by_date, (record.upload_date, document_id))
+        if position < len(self._by_date) and self._by_date[position] == (record.upload_date, document_id):
+            del self._by_date[position]
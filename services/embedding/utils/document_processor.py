@@ -2,18 +2,63 @@ import fitz  # PyMuPDF
 import docx
 from pptx import Presentation
 import io
-from typing import List, Dict, Any
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Tuple, Union, Iterable, Iterator, Optional
 import re
+from array import array
+
+# Tokens of the cleaner: whitespace runs, disallowed characters, kept characters
+CLEAN_TOKEN = re.compile(r'(\s+)|([^\w\s.,!?;:()-]+)|([\w.,!?;:()-]+)')
+
+# Uploaded files are passed around either as raw bytes or as a path on disk
+FileSource = Union[bytes, str, os.PathLike]
+
+_extraction_pool = None
+
+def _open_source(source: FileSource):
+    """Return something python-docx / python-pptx can open without copying a file into memory."""
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source)
+    return os.fspath(source)
+
+def _open_pdf(source: FileSource) -> fitz.Document:
+    """Open a PDF from bytes or, preferably, from a path so pages are read lazily."""
+    if isinstance(source, (bytes, bytearray)):
+        return fitz.open(stream=source, filetype="pdf")
+    return fitz.open(os.fspath(source), filetype="pdf")
+
+def _get_extraction_pool(workers: int) -> ProcessPoolExecutor:
+    """Process pool shared by all parallel PDF extractions in this process."""
+    global _extraction_pool
+    if _extraction_pool is None:
+        _extraction_pool = ProcessPoolExecutor(max_workers=workers)
+    return _extraction_pool
+
+def _extract_page_range(source: FileSource, start: int, stop: int) -> List[Tuple[int, str]]:
+    """Extract the text of pages [start, stop); runs inside a worker process."""
+    pdf_document = _open_pdf(source)
+    try:
+        return [(page_num, pdf_document[page_num].get_text()) for page_num in range(start, stop)]
+    finally:
+        pdf_document.close()
 
 class DocumentProcessor:
-    def __init__(self):
+    def __init__(self, extraction_workers: int = 1, parallel_min_pages: int = 50):
+        """
+        Args:
+            extraction_workers: Worker processes for page-parallel PDF extraction (1 disables it)
+            parallel_min_pages: PDFs with fewer pages are always extracted serially
+        """
         self.supported_formats = ['.pdf', '.docx', '.pptx']
+        self.extraction_workers = extraction_workers
+        self.parallel_min_pages = parallel_min_pages
     
-    def extract_text_from_pdf(self, file_content: bytes) -> str:
-        """Extract text from PDF file content using PyMuPDF."""
+    def extract_text_from_pdf(self, source: FileSource) -> str:
+        """Extract text from a PDF file (bytes or path) using PyMuPDF."""
         try:
-            pdf_file = io.BytesIO(file_content)
-            pdf_document = fitz.open(stream=pdf_file, filetype="pdf")
+            pdf_document = _open_pdf(source)
             text = ""
             
             for page_num in range(pdf_document.page_count):
@@ -27,44 +72,121 @@ class DocumentProcessor:
         except Exception as e:
             raise Exception(f"Error extracting PDF text: {str(e)}")
     
-    def extract_text_with_page_info(self, file_content: bytes, filename: str) -> tuple[str, list]:
+    def extract_text_with_page_info(self, source: FileSource, filename: str) -> tuple[str, list]:
         """Extract text from PDF with page information for better chunking."""
         try:
             file_extension = filename.lower().split('.')[-1]
             
             if file_extension == 'pdf':
-                pdf_file = io.BytesIO(file_content)
-                pdf_document = fitz.open(stream=pdf_file, filetype="pdf")
-                text = ""
-                page_info = []
-                
-                for page_num in range(pdf_document.page_count):
-                    page = pdf_document[page_num]
-                    page_text = page.get_text()
-                    if page_text.strip():
-                        text += page_text + "\n"
-                        page_info.append({
-                            'page_number': page_num + 1,
-                            'start_char': len(text) - len(page_text),
-                            'end_char': len(text),
-                            'text_length': len(page_text)
-                        })
-                
-                pdf_document.close()
-                return text.strip(), page_info
+                pdf_document = _open_pdf(source)
+                page_count = pdf_document.page_count
+                if self.extraction_workers > 1 and page_count >= self.parallel_min_pages:
+                    pdf_document.close()
+                    pages = self._extract_pages_parallel(source, page_count)
+                else:
+                    pages = [(page_num, pdf_document[page_num].get_text()) for page_num in range(page_count)]
+                    pdf_document.close()
+                return self._merge_pages(pages)
             else:
                 # For non-PDF files, return text without page info
-                text = self.extract_text(file_content, filename)
+                text = self.extract_text(source, filename)
                 return text, []
                 
         except Exception as e:
             raise Exception(f"Error extracting text with page info: {str(e)}")
     
-    def extract_text_from_docx(self, file_content: bytes) -> str:
-        """Extract text from DOCX file content."""
+    def _page_ranges(self, page_count: int) -> List[Tuple[int, int]]:
+        # A few ranges per worker keeps the load balanced when page sizes vary
+        range_size = max(1, -(-page_count // (self.extraction_workers * 4)))
+        return [(start, min(start + range_size, page_count)) for start in range(0, page_count, range_size)]
+    
+    def _extract_pages_parallel(self, source: FileSource, page_count: int) -> List[Tuple[int, str]]:
+        """Split the page range across worker processes and collect results in page order."""
+        pool = _get_extraction_pool(self.extraction_workers)
+        futures = [pool.submit(_extract_page_range, source, start, stop) for start, stop in self._page_ranges(page_count)]
+        pages = []
+        for future in futures:
+            pages.extend(future.result())
+        return pages
+    
+    def iter_pages(self, source: FileSource, filename: str) -> Iterator[Tuple[Optional[int], str]]:
+        """
+        Yield the text of a document as (page_number, text) sections in order.
+        
+        PDFs are yielded page by page (1-based page numbers) so later stages
+        can start before extraction finishes; large PDFs are extracted ahead
+        by the worker pool. Other formats are yielded as a single section
+        without a page number.
+        """
+        file_extension = filename.lower().split('.')[-1]
+        if file_extension != 'pdf':
+            yield None, self.extract_text(source, filename)
+            return
+        
+        pdf_document = _open_pdf(source)
+        page_count = pdf_document.page_count
+        if self.extraction_workers > 1 and page_count >= self.parallel_min_pages:
+            pdf_document.close()
+            yield from self._iter_pages_parallel(source, page_count)
+            return
+        try:
+            for page_num in range(page_count):
+                yield page_num + 1, pdf_document[page_num].get_text()
+        finally:
+            pdf_document.close()
+    
+    def _iter_pages_parallel(self, source: FileSource, page_count: int) -> Iterator[Tuple[int, str]]:
+        """Extract page ranges in worker processes, keeping only a few ranges ahead of the consumer."""
+        pool = _get_extraction_pool(self.extraction_workers)
+        ranges = iter(self._page_ranges(page_count))
+        pending = deque()
         try:
-            doc_file = io.BytesIO(file_content)
-            doc = docx.Document(doc_file)
+            for start, stop in ranges:
+                pending.append(pool.submit(_extract_page_range, source, start, stop))
+                if len(pending) >= self.extraction_workers * 2:
+                    break
+            while pending:
+                pages = pending.popleft().result()
+                next_range = next(ranges, None)
+                if next_range is not None:
+                    pending.append(pool.submit(_extract_page_range, source, *next_range))
+                for page_num, page_text in pages:
+                    yield page_num + 1, page_text
+        finally:
+            for future in pending:
+                future.cancel()
+    
+    def _merge_pages(self, pages: List[Tuple[int, str]]) -> tuple[str, list]:
+        """Join page texts and record the character range of each page in the result."""
+        parts = []
+        page_info = []
+        position = 0
+        for page_num, page_text in pages:
+            if page_text.strip():
+                parts.append(page_text)
+                parts.append("\n")
+                page_info.append({
+                    'page_number': page_num + 1,
+                    'start_char': position,
+                    'end_char': position + len(page_text),
+                    'text_length': len(page_text)
+                })
+                position += len(page_text) + 1
+        
+        text = "".join(parts)
+        # Keep offsets valid for the stripped text
+        leading = len(text) - len(text.lstrip())
+        text = text.strip()
+        if leading:
+            for page in page_info:
+                page['start_char'] = max(0, page['start_char'] - leading)
+                page['end_char'] = max(0, page['end_char'] - leading)
+        return text, page_info
+    
+    def extract_text_from_docx(self, source: FileSource) -> str:
+        """Extract text from a DOCX file (bytes or path)."""
+        try:
+            doc = docx.Document(_open_source(source))
             text = ""
             
             for paragraph in doc.paragraphs:
@@ -74,11 +196,10 @@ class DocumentProcessor:
         except Exception as e:
             raise Exception(f"Error extracting DOCX text: {str(e)}")
     
-    def extract_text_from_pptx(self, file_content: bytes) -> str:
-        """Extract text from PPTX file content."""
+    def extract_text_from_pptx(self, source: FileSource) -> str:
+        """Extract text from a PPTX file (bytes or path)."""
         try:
-            ppt_file = io.BytesIO(file_content)
-            prs = Presentation(ppt_file)
+            prs = Presentation(_open_source(source))
             text = ""
             
             for slide_num, slide in enumerate(prs.slides):
@@ -92,19 +213,70 @@ class DocumentProcessor:
         except Exception as e:
             raise Exception(f"Error extracting PPTX text: {str(e)}")
     
-    def extract_text(self, file_content: bytes, filename: str) -> str:
+    def extract_text(self, source: FileSource, filename: str) -> str:
         """Extract text from supported file formats."""
         file_extension = filename.lower().split('.')[-1]
         
         if file_extension == 'pdf':
-            return self.extract_text_from_pdf(file_content)
+            return self.extract_text_from_pdf(source)
         elif file_extension == 'docx':
-            return self.extract_text_from_docx(file_content)
+            return self.extract_text_from_docx(source)
         elif file_extension == 'pptx':
-            return self.extract_text_from_pptx(file_content)
+            return self.extract_text_from_pptx(source)
         else:
             raise ValueError(f"Unsupported file format: {file_extension}")
     
+    def clean_text_with_offsets(self, text: str) -> Tuple[str, array]:
+        """
+        Clean text exactly like `clean_text`, in a single pass, and keep an offset map.
+        
+        Returns the cleaned text and an array where entry i is the position
+        in `text` that cleaned character i came from, so offsets recorded
+        before cleaning (such as page ranges) stay usable afterwards.
+        """
+        parts = []
+        offsets = array('I')
+        for match in CLEAN_TOKEN.finditer(text):
+            if match.lastindex == 1:
+                # Whitespace run collapses to a single space
+                parts.append(' ')
+                offsets.append(match.start())
+            elif match.lastindex == 3:
+                parts.append(match.group())
+                offsets.extend(range(match.start(), match.end()))
+            # lastindex == 2: disallowed characters are dropped
+        
+        cleaned = ''.join(parts)
+        start = len(cleaned) - len(cleaned.lstrip())
+        end = len(cleaned.rstrip())
+        return cleaned[start:end], offsets[start:end]
+    
+    def clean_stream(self, pieces: Iterable[str]) -> Iterator[str]:
+        """
+        Clean text that arrives in pieces, yielding one cleaned piece per input piece.
+        
+        The cleaned pieces join to exactly `clean_text("".join(pieces))`:
+        whitespace runs spanning two pieces collapse once, and spaces are
+        held back until more text follows so the result is stripped.
+        """
+        in_whitespace = False  # The input so far ends inside a whitespace run
+        started = False  # Some non-space text has been yielded
+        pending_spaces = 0
+        for piece in pieces:
+            parts = []
+            for match in CLEAN_TOKEN.finditer(piece):
+                if match.lastindex == 1:
+                    if started and not (in_whitespace and match.start() == 0):
+                        pending_spaces += 1
+                elif match.lastindex == 3:
+                    if pending_spaces:
+                        parts.append(' ' * pending_spaces)
+                        pending_spaces = 0
+                    parts.append(match.group())
+                    started = True
+                in_whitespace = match.lastindex == 1
+            yield ''.join(parts)
+    
     def clean_text(self, text: str) -> str:
         """Clean and normalize extracted text."""
         # Remove excessive whitespace
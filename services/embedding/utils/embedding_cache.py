@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Persistent content-hash embedding cache backed by SQLite
+"""
+
+import hashlib
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from utils.sqlite_cache import SQLiteLRUCache
+
+class EmbeddingCache(SQLiteLRUCache):
+    """
+    On-disk cache of chunk embeddings keyed by (model id, sha256 of text).
+
+    Vectors are stored as raw float32 blobs in a single SQLite file, so the
+    cache survives restarts. When the total size exceeds `max_bytes` the
+    least recently used entries are evicted.
+    """
+
+    TABLE = "embeddings"
+    KEY_COLUMNS = ("model", "text_hash")
+    VALUE_COLUMN = "vector"
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS embeddings (
+            model TEXT NOT NULL,
+            text_hash BLOB NOT NULL,
+            vector BLOB NOT NULL,
+            last_access REAL NOT NULL,
+            PRIMARY KEY (model, text_hash)
+        ) WITHOUT ROWID
+    """
+
+    def __init__(self, db_file="./embedding_cache.db", max_bytes: int = 2 * 1024 ** 3):
+        super().__init__(db_file, max_bytes)
+
+    @staticmethod
+    def hash_text(text: str) -> bytes:
+        return hashlib.sha256(text.encode("utf-8")).digest()
+
+    def get_many(self, model: str, texts: List[str]) -> Dict[int, np.ndarray]:
+        """Look up texts and return {position in texts: embedding} for the hits."""
+        if not texts:
+            return {}
+        positions: Dict[bytes, List[int]] = {}
+        for i, text in enumerate(texts):
+            positions.setdefault(self.hash_text(text), []).append(i)
+
+        found: Dict[int, np.ndarray] = {}
+        hashes = list(positions)
+        now = time.time()
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *batch]
+                ).fetchall()
+                for text_hash, blob in rows:
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    for i in positions[text_hash]:
+                        found[i] = vector
+                self._touch([(model, text_hash) for text_hash, _ in rows], now)
+            self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(texts) - len(found)
+        return found
+
+    def put_many(self, model: str, texts: List[str], vectors: np.ndarray):
+        """Store embeddings for texts and evict old entries if over budget."""
+        self._store([
+            ((model, self.hash_text(text)), np.ascontiguousarray(vector, dtype=np.float32).tobytes())
+            for text, vector in zip(texts, vectors)
+        ])
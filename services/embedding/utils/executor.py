@@ -0,0 +1,54 @@
+import asyncio
+import functools
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable
+
+class BlockingExecutor:
+    """
+    Runs blocking work off the asyncio event loop.
+
+    CPU-bound stages (extraction, cleaning, chunking) go to a thread or
+    process pool depending on `kind`. Work that needs objects living in this
+    process (the embedding model, the Chroma client) always goes to a thread
+    pool. A semaphore bounds the number of in-flight document jobs so a burst
+    of uploads queues up instead of oversubscribing the workers.
+    """
+
+    def __init__(self, kind: str = "thread", max_workers: int = 4, max_inflight: int = 8):
+        """
+        Args:
+            kind: "thread" or "process" pool for CPU-bound stages
+            max_workers: Number of workers in each pool
+            max_inflight: Maximum number of document jobs processed at the same time
+        """
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unsupported executor kind: {kind}")
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_inflight = max_inflight
+        self._io_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="blocking-io")
+        self._cpu_pool: Executor = (
+            ProcessPoolExecutor(max_workers=max_workers) if kind == "process" else self._io_pool
+        )
+        self._semaphore = asyncio.Semaphore(max_inflight)
+
+    def job(self) -> asyncio.Semaphore:
+        """Slot for one document job: `async with executor.job(): ...`"""
+        return self._semaphore
+
+    async def _submit(self, pool: Executor, fn: Callable, *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(pool, functools.partial(fn, *args, **kwargs))
+
+    async def run_cpu(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run a CPU-bound function; it must be picklable when kind is "process"."""
+        return await self._submit(self._cpu_pool, fn, *args, **kwargs)
+
+    async def run_io(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run blocking work that has to stay in this process."""
+        return await self._submit(self._io_pool, fn, *args, **kwargs)
+
+    def shutdown(self):
+        if self._cpu_pool is not self._io_pool:
+            self._cpu_pool.shutdown(wait=False, cancel_futures=True)
+        self._io_pool.shutdown(wait=False, cancel_futures=True)
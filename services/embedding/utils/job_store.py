@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Persistent ingestion job records backed by SQLite (WAL mode)
+"""
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import List, Optional
+
+COLUMNS = (
+    "job_id", "document_id", "document_name", "file_path", "content_hash", "force", "status", "stage",
+    "pages_extracted", "chunks_embedded", "chunks_written", "result", "error",
+    "created_at", "updated_at"
+)
+
+# Jobs in these states have not finished and are resumed after a restart
+UNFINISHED = ("queued", "running")
+FINISHED = ("completed", "failed")
+
+class JobRecord:
+    """State and progress of one background ingestion job."""
+
+    __slots__ = COLUMNS
+
+    def __init__(self, job_id: str, document_id: str, document_name: str, file_path: str, content_hash: Optional[str] = None, force: bool = False, status: str = "queued", stage: str = "queued", pages_extracted: int = 0, chunks_embedded: int = 0, chunks_written: int = 0, result: Optional[dict] = None, error: Optional[str] = None, created_at: datetime = None, updated_at: datetime = None):
+        self.job_id = job_id
+        self.document_id = document_id
+        self.document_name = document_name
+        self.file_path = file_path
+        self.content_hash = content_hash
+        self.force = bool(force)
+        self.status = status
+        self.stage = stage
+        self.pages_extracted = pages_extracted
+        self.chunks_embedded = chunks_embedded
+        self.chunks_written = chunks_written
+        self.result = result
+        self.error = error
+        self.created_at = created_at or datetime.now()
+        self.updated_at = updated_at or self.created_at
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> "JobRecord":
+        data = dict(row)
+        data["result"] = json.loads(data["result"]) if data["result"] else None
+        data["created_at"] = datetime.fromisoformat(data["created_at"])
+        data["updated_at"] = datetime.fromisoformat(data["updated_at"])
+        return cls(**data)
+
+    def to_row(self) -> tuple:
+        values = []
+        for name in COLUMNS:
+            value = getattr(self, name)
+            if name == "result":
+                value = json.dumps(value) if value is not None else None
+            elif isinstance(value, datetime):
+                value = value.isoformat()
+            values.append(value)
+        return tuple(values)
+
+    def to_dict(self) -> dict:
+        """Public view of the job; the spool file path, content hash and force flag stay internal."""
+        return {name: getattr(self, name) for name in COLUMNS if name not in ("file_path", "content_hash", "force")}
+
+class JobStore:
+    def __init__(self, storage_file="./jobs.db"):
+        """
+        Args:
+            storage_file: SQLite database holding ingestion jobs
+        """
+        self.storage_file = Path(storage_file)
+        # One connection shared across threads, serialized by a lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.storage_file), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    document_id TEXT NOT NULL,
+                    document_name TEXT NOT NULL,
+                    file_path TEXT NOT NULL,
+                    content_hash TEXT,
+                    force INTEGER NOT NULL DEFAULT 0,
+                    status TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    pages_extracted INTEGER NOT NULL DEFAULT 0,
+                    chunks_embedded INTEGER NOT NULL DEFAULT 0,
+                    chunks_written INTEGER NOT NULL DEFAULT 0,
+                    result TEXT,
+                    error TEXT,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+                """
+            )
+            # Stores created before content hashing / near-duplicate detection lack these columns
+            existing = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            if "content_hash" not in existing:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN content_hash TEXT")
+            if "force" not in existing:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN force INTEGER NOT NULL DEFAULT 0")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)")
+
+    def save(self, job: JobRecord):
+        """Insert or update a job."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO jobs ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                job.to_row()
+            )
+
+    def get(self, job_id: str) -> Optional[JobRecord]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return JobRecord.from_row(row) if row else None
+
+    def prune(self, finished_before: datetime) -> int:
+        """Delete jobs that finished before the given time; returns how many were deleted."""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                f"DELETE FROM jobs WHERE status IN ({', '.join('?' * len(FINISHED))}) AND updated_at < ?",
+                (*FINISHED, finished_before.isoformat())
+            )
+        return cursor.rowcount
+
+    def unfinished(self) -> List[JobRecord]:
+        """Jobs that were queued or running when the service stopped, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM jobs WHERE status IN ({', '.join('?' * len(UNFINISHED))}) ORDER BY created_at",
+                UNFINISHED
+            ).fetchall()
+        return [JobRecord.from_row(row) for row in rows]
@@ -1,71 +1,131 @@
 #!/usr/bin/env python3
 """
-File-based metadata storage for document persistence
+Transactional document metadata storage backed by SQLite (WAL mode)
 """
 
 import json
-import os
+import sqlite3
+import threading
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Tuple
+
+COLUMNS = ("document_id", "document_name", "upload_date", "total_chunks", "total_characters", "file_type", "content_hash")
 
 class MetadataStorage:
-    def __init__(self, storage_file="./metadata.json"):
+    def __init__(self, storage_file="./metadata.db", legacy_json_file="./metadata.json"):
+        """
+        Args:
+            storage_file: SQLite database holding document metadata
+            legacy_json_file: Old JSON metadata file, imported once if present
+        """
         self.storage_file = Path(storage_file)
-        self.metadata = {}
-        self.load_metadata()
-    
-    def load_metadata(self):
-        """Load metadata from file."""
-        try:
-            if self.storage_file.exists():
-                with open(self.storage_file, 'r') as f:
-                    self.metadata = json.load(f)
-                print(f"📚 Loaded {len(self.metadata)} documents from metadata file")
-            else:
-                print("📝 No existing metadata file found")
-        except Exception as e:
-            print(f"⚠️  Error loading metadata: {e}")
-            self.metadata = {}
+        self.legacy_json_file = Path(legacy_json_file) if legacy_json_file else None
+        # One connection shared across threads, serialized by a lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.storage_file), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS documents (
+                    document_id TEXT PRIMARY KEY,
+                    document_name TEXT NOT NULL,
+                    upload_date TEXT NOT NULL,
+                    total_chunks INTEGER NOT NULL,
+                    total_characters INTEGER NOT NULL,
+                    file_type TEXT NOT NULL,
+                    content_hash TEXT
+                )
+                """
+            )
+            # Stores created before content hashing lack the column
+            existing = {row["name"] for row in self._conn.execute("PRAGMA table_info(documents)")}
+            if "content_hash" not in existing:
+                self._conn.execute("ALTER TABLE documents ADD COLUMN content_hash TEXT")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS documents_content_hash ON documents (content_hash)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS storage_meta (key TEXT PRIMARY KEY, value TEXT)")
+            # MinHash signatures for near-duplicate detection, one per document
+            self._conn.execute("CREATE TABLE IF NOT EXISTS minhash_signatures (document_id TEXT PRIMARY KEY, signature BLOB NOT NULL)")
+        self.import_legacy_json()
+        print(f"📚 Loaded {self.count()} documents from metadata store")
     
-    def save_metadata(self):
-        """Save metadata to file."""
-        try:
-            with open(self.storage_file, 'w') as f:
-                json.dump(self.metadata, f, indent=2, default=str)
-            print(f"💾 Saved {len(self.metadata)} documents to metadata file")
-        except Exception as e:
-            print(f"⚠️  Error saving metadata: {e}")
+    def import_legacy_json(self):
+        """One-time import of documents from the old metadata.json file."""
+        if not self.legacy_json_file or not self.legacy_json_file.exists():
+            return
+        with self._lock:
+            imported = self._conn.execute(
+                "SELECT value FROM storage_meta WHERE key = 'legacy_json_imported'"
+            ).fetchone()
+            if imported:
+                return
+            try:
+                with open(self.legacy_json_file, 'r') as f:
+                    legacy = json.load(f)
+                with self._conn:
+                    self._conn.executemany(
+                        f"INSERT OR IGNORE INTO documents ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                        [tuple(doc.get(column) for column in COLUMNS) for doc in legacy.values()]
+                    )
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO storage_meta (key, value) VALUES ('legacy_json_imported', ?)",
+                        (datetime.now().isoformat(),)
+                    )
+                print(f"📥 Imported {len(legacy)} documents from {self.legacy_json_file}")
+            except Exception as e:
+                print(f"⚠️  Error importing legacy metadata: {e}")
     
-    def add_document(self, document_id: str, document_name: str, total_chunks: int, total_characters: int, file_type: str):
+    def add_document(self, document_id: str, document_name: str, total_chunks: int, total_characters: int, file_type: str, upload_date: datetime = None, content_hash: str = None):
         """Add document metadata."""
-        self.metadata[document_id] = {
-            "document_id": document_id,
-            "document_name": document_name,
-            "upload_date": datetime.now().isoformat(),
-            "total_chunks": total_chunks,
-            "total_characters": total_characters,
-            "file_type": file_type
-        }
-        self.save_metadata()
+        upload_date = upload_date or datetime.now()
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO documents ({', '.join(COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (document_id, document_name, upload_date.isoformat(), total_chunks, total_characters, file_type, content_hash)
+            )
     
     def get_document(self, document_id: str) -> Dict[str, Any]:
         """Get document metadata."""
-        return self.metadata.get(document_id)
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM documents WHERE document_id = ?", (document_id,)).fetchone()
+        return dict(row) if row else None
     
     def get_all_documents(self) -> List[Dict[str, Any]]:
         """Get all document metadata."""
-        return list(self.metadata.values())
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM documents ORDER BY upload_date").fetchall()
+        return [dict(row) for row in rows]
+    
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
     
     def delete_document(self, document_id: str) -> bool:
         """Delete document metadata."""
-        if document_id in self.metadata:
-            del self.metadata[document_id]
-            self.save_metadata()
-            return True
-        return False
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM documents WHERE document_id = ?", (document_id,))
+            self._conn.execute("DELETE FROM minhash_signatures WHERE document_id = ?", (document_id,))
+        return cursor.rowcount > 0
     
     def clear_all(self):
         """Clear all metadata."""
-        self.metadata = {}
-        self.save_metadata()
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM documents")
+            self._conn.execute("DELETE FROM minhash_signatures")
+    
+    def add_signature(self, document_id: str, signature: bytes):
+        """Store a document's MinHash signature."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO minhash_signatures (document_id, signature) VALUES (?, ?)",
+                (document_id, signature)
+            )
+    
+    def get_all_signatures(self) -> List[Tuple[str, bytes]]:
+        """(document_id, signature) of all documents with a MinHash signature."""
+        with self._lock:
+            rows = self._conn.execute("SELECT document_id, signature FROM minhash_signatures").fetchall()
+        return [(row["document_id"], row["signature"]) for row in rows]
@@ -0,0 +1,198 @@
+import threading
+import zlib
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from utils.metadata_storage import MetadataStorage
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+# Shingles hashed per numpy block; bounds the (block x num_perm) temporary
+BLOCK_SIZE = 8192
+
+class MinHash:
+    """
+    Family of `num_perm` hash functions for MinHash signatures of word shingles.
+
+    The functions are drawn from a fixed seed, so signatures computed in
+    different processes or before a restart can be compared.
+    """
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 5, seed: int = 1):
+        """
+        Args:
+            num_perm: Signature length; more permutations estimate similarity more precisely
+            shingle_size: Number of consecutive words per shingle
+            seed: Seed of the hash functions
+        """
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, int(MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, int(MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+
+    def hasher(self) -> "MinHasher":
+        return MinHasher(self)
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature of a whole text."""
+        hasher = self.hasher()
+        hasher.update(text)
+        return hasher.digest()
+
+class MinHasher:
+    """
+    Incremental MinHash of text that arrives in pieces.
+
+    Feeding the pieces of a text gives the same signature as hashing the
+    joined text at once; words and shingles spanning two pieces are
+    carried over.
+    """
+
+    def __init__(self, family: MinHash):
+        self.family = family
+        self.values = np.full(family.num_perm, MAX_HASH, dtype=np.uint64)
+        self._partial = ""  # Word that may continue in the next piece
+        self._previous: List[str] = []  # Last shingle_size - 1 words
+        self._words = 0
+
+    def update(self, piece: str):
+        text = self._partial + piece.lower()
+        words = text.split()
+        self._partial = words.pop() if words and not text[-1].isspace() else ""
+        self._add_words(words)
+
+    def digest(self) -> np.ndarray:
+        if self._partial:
+            self._add_words([self._partial])
+            self._partial = ""
+        if 0 < self._words < self.family.shingle_size:
+            # Too short for a full shingle; the whole text is the only shingle
+            self._add_hashes([zlib.crc32(" ".join(self._previous).encode())])
+            self._words = self.family.shingle_size
+        return self.values.copy()
+
+    def _add_words(self, words: List[str]):
+        if not words:
+            return
+        self._words += len(words)
+        window = self._previous + words
+        size = self.family.shingle_size
+        self._previous = window[-(size - 1):] if size > 1 else []
+        self._add_hashes([
+            zlib.crc32(" ".join(window[i:i + size]).encode())
+            for i in range(len(window) - size + 1)
+        ])
+
+    def _add_hashes(self, hashes: List[int]):
+        for start in range(0, len(hashes), BLOCK_SIZE):
+            block = np.asarray(hashes[start:start + BLOCK_SIZE], dtype=np.uint64)
+            permuted = (block[:, None] * self.family.a + self.family.b) % MERSENNE_PRIME & MAX_HASH
+            np.minimum(self.values, permuted.min(axis=0), out=self.values)
+
+def jaccard(signature_a: np.ndarray, signature_b: np.ndarray) -> float:
+    """Jaccard similarity of two shingle sets, estimated from their signatures."""
+    return float(np.mean(signature_a == signature_b))
+
+def lsh_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    Number of bands and rows per band for a similarity threshold.
+
+    Documents sharing all rows of any band become candidates; the
+    candidate probability rises steeply around (1 / bands) ** (1 / rows),
+    which is placed just below the threshold so near-copies are not missed.
+    """
+    best = (num_perm, 1)
+    best_distance = float("inf")
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        knee = (1 / bands) ** (1 / rows)
+        if knee <= threshold and threshold - knee < best_distance:
+            best, best_distance = (bands, rows), threshold - knee
+    return best
+
+class NearDuplicateIndex:
+    """
+    LSH index over the MinHash signatures of stored documents.
+
+    Signatures are written through to the metadata store and loaded into
+    memory at startup, bucketed by band, so finding near-duplicates of a
+    new document only compares it with the documents sharing a bucket.
+    """
+
+    def __init__(self, storage: MetadataStorage, family: MinHash, threshold: float = 0.8):
+        """
+        Args:
+            storage: Metadata store holding the signatures
+            family: Hash functions the signatures were computed with
+            threshold: Estimated Jaccard similarity from which documents are near-duplicates
+        """
+        self.storage = storage
+        self.family = family
+        self.threshold = threshold
+        self.bands, self.rows = lsh_bands(family.num_perm, threshold)
+        self._lock = threading.RLock()
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._buckets: Dict[Tuple[int, bytes], Set[str]] = {}
+        for document_id, signature in storage.get_all_signatures():
+            signature = np.frombuffer(signature, dtype=np.uint64)
+            if len(signature) == family.num_perm:
+                self._index(document_id, signature)
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def add(self, document_id: str, signature: np.ndarray):
+        """Persist a document's signature and add it to the buckets."""
+        with self._lock:
+            self.storage.add_signature(document_id, signature.astype(np.uint64).tobytes())
+            if document_id in self._signatures:
+                self._unindex(document_id)
+            self._index(document_id, signature)
+
+    def remove(self, document_id: str):
+        """Forget a document; its signature row goes with the document's metadata."""
+        with self._lock:
+            if document_id in self._signatures:
+                self._unindex(document_id)
+
+    def clear(self):
+        """Forget all documents; the signature rows go with the metadata store's clear_all."""
+        with self._lock:
+            self._signatures.clear()
+            self._buckets.clear()
+
+    def find(self, signature: np.ndarray, threshold: Optional[float] = None) -> List[Tuple[str, float]]:
+        """Stored documents at least `threshold` similar to `signature`, most similar first."""
+        threshold = self.threshold if threshold is None else threshold
+        with self._lock:
+            candidates = set()
+            for key in self._keys(signature):
+                candidates.update(self._buckets.get(key, ()))
+            matches = [(document_id, jaccard(signature, self._signatures[document_id])) for document_id in candidates]
+        return sorted(
+            [(document_id, similarity) for document_id, similarity in matches if similarity >= threshold],
+            key=lambda match: match[1],
+            reverse=True
+        )
+
+    def _keys(self, signature: np.ndarray):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def _index(self, document_id: str, signature: np.ndarray):
+        self._signatures[document_id] = signature
+        for key in self._keys(signature):
+            self._buckets.setdefault(key, set()).add(document_id)
+
+    def _unindex(self, document_id: str):
+        signature = self._signatures.pop(document_id)
+        for key in self._keys(signature):
+            ids = self._buckets.get(key)
+            if ids is not None:
+                ids.discard(document_id)
+                if not ids:
+                    del self._buckets[key]
@@ -0,0 +1,82 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+class QueryEmbeddingCache:
+    """
+    Bounded in-process LRU cache for query embeddings.
+
+    Entries are keyed by (model name, normalized query text) and stored as
+    contiguous float32 vectors. Entries older than `ttl_seconds` are treated
+    as misses and dropped.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 3600.0):
+        """
+        Args:
+            max_size: Maximum number of cached queries (0 disables the cache)
+            ttl_seconds: Lifetime of an entry in seconds (0 means no expiry)
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[np.ndarray, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Normalize query text so trivial variations share an entry."""
+        return " ".join(query.lower().split())
+
+    def get(self, model_name: str, query: str) -> Optional[np.ndarray]:
+        """Return the cached embedding for a query, or None on a miss."""
+        key = (model_name, self.normalize(query))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                vector, stored_at = entry
+                if not self.ttl_seconds or time.monotonic() - stored_at < self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return vector
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, model_name: str, query: str, vector: np.ndarray):
+        """Store a query embedding, evicting the least recently used entries."""
+        if self.max_size <= 0:
+            return
+        key = (model_name, self.normalize(query))
+        vector = np.ascontiguousarray(vector, dtype=np.float32)
+        vector.setflags(write=False)
+        with self._lock:
+            self._entries[key] = (vector, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop all entries and reset counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, float]:
+        """Report size and hit/miss counters."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "bytes": sum(vector.nbytes for vector, _ in self._entries.values()),
+            }
@@ -1,19 +1,32 @@
 from pydantic import BaseModel
-from typing import Union, List, Optional
+from typing import Union, List, Literal, Optional
 from datetime import datetime
 
 class EmbedRequest(BaseModel):
     content: Union[str, List[str]]
     metadata: Optional[Union[dict, List[dict]]] = None
+    ids: Optional[List[str]] = None  # Caller-supplied ids; existing items with these ids are replaced
 
 class SearchRequest(BaseModel):
     query: str
     k: int = 5
     document_id: Optional[str] = None  # Filter by specific document
+    document_ids: Optional[List[str]] = None  # Filter by any of these documents
+    file_types: Optional[List[str]] = None  # Filter by file type, e.g. ["pdf", "pptx"]
+    upload_date_from: Optional[datetime] = None  # Only chunks uploaded at or after this time
+    upload_date_to: Optional[datetime] = None  # Only chunks uploaded at or before this time
+    mode: Literal["vector", "lexical", "hybrid"] = "vector"  # Ranking: dense, BM25, or both fused
+
+class SearchBatchRequest(BaseModel):
+    queries: List[SearchRequest]
 
 class DeleteRequest(BaseModel):
     ids: List[str]
 
+class NearDuplicate(BaseModel):
+    document_id: str
+    similarity: float  # Estimated Jaccard similarity of the word shingles
+
 class DocumentUploadResponse(BaseModel):
     document_id: str
     document_name: str
@@ -21,6 +34,40 @@ class DocumentUploadResponse(BaseModel):
     total_characters: int
     processing_time: float
     success: bool
+    duplicate: bool = False  # Same content was already stored; document_id is the existing document
+    near_duplicates: List[NearDuplicate] = []  # Stored documents with nearly the same text, most similar first
+
+class BulkUploadItem(BaseModel):
+    document_name: str
+    archive: Optional[str] = None  # ZIP archive the document came from
+    document_id: Optional[str] = None  # Set when the document was stored
+    success: bool
+    chunks_created: int = 0
+    total_characters: int = 0
+    duplicate: bool = False  # Same content was already stored under document_id
+    near_duplicates: List[NearDuplicate] = []  # Stored documents with nearly the same text, most similar first
+    error: Optional[str] = None
+
+class BulkUploadResponse(BaseModel):
+    documents: List[BulkUploadItem]  # One entry per uploaded file or archive entry
+    documents_created: int
+    chunks_created: int
+    processing_time: float
+    success: bool  # True when every document was stored
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    document_id: str  # Id the document is stored under once the job completes
+    document_name: str
+    status: Literal["queued", "running", "completed", "failed"]
+    stage: str  # queued, extracting, embedding, writing, completed or failed
+    pages_extracted: int
+    chunks_embedded: int
+    chunks_written: int
+    result: Optional[DocumentUploadResponse] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
 
 class DocumentInfo(BaseModel):
     document_id: str
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Size-bounded least-recently-used cache table in a SQLite file (WAL mode)
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+class SQLiteLRUCache:
+    """
+    Base for on-disk caches that evict least recently used entries.
+
+    A subclass names its table, the key columns and the blob column, and
+    provides the CREATE TABLE statement; the table must also have a REAL
+    `last_access` column. This class keeps one connection shared across
+    threads behind a lock, tracks the total size of the stored blobs, evicts
+    the oldest entries when that exceeds `max_bytes`, and counts hits and
+    misses for `stats()`.
+    """
+
+    TABLE: str = ""
+    KEY_COLUMNS: Tuple[str, ...] = ()
+    VALUE_COLUMN: str = ""
+    SCHEMA: str = ""
+    # Entries deleted per eviction query
+    EVICT_BATCH = 256
+
+    def __init__(self, db_file, max_bytes: int):
+        self.db_file = Path(db_file)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_file), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(self.SCHEMA)
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.TABLE}_access ON {self.TABLE} (last_access)")
+        self._conn.commit()
+        self.total_bytes = self._conn.execute(
+            f"SELECT COALESCE(SUM(LENGTH({self.VALUE_COLUMN})), 0) FROM {self.TABLE}"
+        ).fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+        self._key_filter = " AND ".join(f"{column} = ?" for column in self.KEY_COLUMNS)
+
+    def _touch(self, keys: Sequence[tuple], now: float = None):
+        """Mark entries as just used; caller holds the lock and commits."""
+        if keys:
+            self._conn.executemany(
+                f"UPDATE {self.TABLE} SET last_access = ? WHERE {self._key_filter}",
+                [(now or time.time(), *key) for key in keys]
+            )
+
+    def _store(self, entries: List[Tuple[tuple, bytes]]):
+        """Insert or replace (key, blob) entries, then evict down to max_bytes."""
+        if not entries:
+            return
+        # A key given twice is stored once
+        entries = list(dict(entries).items())
+        now = time.time()
+        columns = (*self.KEY_COLUMNS, self.VALUE_COLUMN, "last_access")
+        placeholders = ",".join("?" * len(columns))
+        with self._lock:
+            for key, _ in entries:
+                existing = self._conn.execute(
+                    f"SELECT LENGTH({self.VALUE_COLUMN}) FROM {self.TABLE} WHERE {self._key_filter}",
+                    key
+                ).fetchone()
+                if existing:
+                    self.total_bytes -= existing[0]
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {self.TABLE} ({', '.join(columns)}) VALUES ({placeholders})",
+                [(*key, data, now) for key, data in entries]
+            )
+            self.total_bytes += sum(len(data) for _, data in entries)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        while self.total_bytes > self.max_bytes:
+            candidates = self._conn.execute(
+                f"SELECT {', '.join(self.KEY_COLUMNS)}, LENGTH({self.VALUE_COLUMN}) FROM {self.TABLE} "
+                f"ORDER BY last_access LIMIT {self.EVICT_BATCH}"
+            ).fetchall()
+            if not candidates:
+                self.total_bytes = 0
+                break
+            victims = []
+            for *key, size in candidates:
+                if self.total_bytes <= self.max_bytes:
+                    break
+                victims.append(key)
+                self.total_bytes -= size
+            self._conn.executemany(f"DELETE FROM {self.TABLE} WHERE {self._key_filter}", victims)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": self._conn.execute(f"SELECT COUNT(*) FROM {self.TABLE}").fetchone()[0],
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
@@ -1,7 +1,14 @@
 import re
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple, Iterable, Iterator
 from dataclasses import dataclass
 
+# Sentence boundary: whitespace preceded by sentence-ending punctuation
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+
+def make_chunk_id(document_id: str, chunk_index: int) -> str:
+    """Deterministic vector-store id of a document chunk."""
+    return f"{document_id}_chunk_{chunk_index}"
+
 @dataclass
 class TextChunk:
     """Represents a chunk of text with metadata."""
@@ -14,28 +21,78 @@ class TextChunk:
     end_char: int
     page_number: int = None
 
+_tokenizers = {}
+
+def get_tokenizer(model_name: str):
+    """Fast tokenizer of an embedding model, loaded once per process."""
+    tokenizer = _tokenizers.get(model_name)
+    if tokenizer is None:
+        from transformers import AutoTokenizer
+        tokenizer = _tokenizers[model_name] = AutoTokenizer.from_pretrained(model_name, use_fast=True)
+    return tokenizer
+
 class TextChunker:
-    def __init__(self, chunk_size: int = 800, overlap_size: int = 100):
+    def __init__(self, chunk_size: int = 800, overlap_size: int = 100, mode: str = "chars", tokenizer_name: str = None, token_target: int = 384, token_overlap: int = 48, max_tokens: int = 512):
         """
         Initialize the text chunker.
         
         Args:
-            chunk_size: Maximum number of characters per chunk
-            overlap_size: Number of characters to overlap between chunks
+            chunk_size: Maximum number of characters per chunk ("chars" mode)
+            overlap_size: Number of characters to overlap between chunks ("chars" mode)
+            mode: "chars" budgets chunks by characters, "tokens" by tokenizer tokens
+            tokenizer_name: Model whose fast tokenizer measures chunks ("tokens" mode)
+            token_target: Number of tokens each chunk is packed up to ("tokens" mode)
+            token_overlap: Number of tokens to overlap between chunks ("tokens" mode)
+            max_tokens: Model input limit, including the two special tokens ("tokens" mode)
         """
+        if mode not in ("chars", "tokens"):
+            raise ValueError(f"Unsupported chunking mode: {mode}")
+        if mode == "tokens" and not tokenizer_name:
+            raise ValueError("Token chunking needs a tokenizer_name")
         self.chunk_size = chunk_size
         self.overlap_size = overlap_size
+        self.mode = mode
+        self.tokenizer_name = tokenizer_name
+        # Leave room for [CLS] and [SEP] so chunks are never truncated
+        self.token_target = min(token_target, max_tokens - 2)
+        self.token_overlap = token_overlap
     
     def split_into_sentences(self, text: str) -> List[str]:
         """Split text into sentences using regex."""
-        # Split on sentence endings, keeping the punctuation
-        sentences = re.split(r'(?<=[.!?])\s+', text)
-        return [s.strip() for s in sentences if s.strip()]
+        return [text[start:end] for start, end in self.sentence_spans(text)]
+    
+    def sentence_spans(self, text: str) -> List[Tuple[int, int]]:
+        """
+        Locate sentences as (start, end) index pairs into `text`.
+        
+        Sentences end at '.', '!' or '?' followed by whitespace; surrounding
+        whitespace is excluded from each span.
+        """
+        spans = []
+        start = 0
+        for boundary in SENTENCE_BOUNDARY.finditer(text):
+            self._add_span(spans, text, start, boundary.start())
+            start = boundary.end()
+        self._add_span(spans, text, start, len(text))
+        return spans
+    
+    @staticmethod
+    def _add_span(spans: List[Tuple[int, int]], text: str, start: int, end: int):
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if start < end:
+            spans.append((start, end))
     
     def create_chunks(self, text: str, document_id: str, document_name: str, page_number: int = None) -> List[TextChunk]:
         """
         Create overlapping chunks from text.
         
+        Works in one pass over sentence spans; chunk text is only sliced out
+        of `text` when a chunk is emitted, so `start_char`/`end_char` are
+        exact offsets into `text`.
+        
         Args:
             text: The text to chunk
             document_id: Unique identifier for the document
@@ -45,61 +102,15 @@ class TextChunker:
         Returns:
             List of TextChunk objects
         """
-        if not text.strip():
+        spans = self.sentence_spans(text)
+        if not spans:
             return []
         
-        # Split into sentences first
-        sentences = self.split_into_sentences(text)
-        if not sentences:
-            return []
-        
-        chunks = []
-        current_chunk = ""
-        current_start = 0
-        chunk_index = 0
-        
-        for i, sentence in enumerate(sentences):
-            # Check if adding this sentence would exceed chunk size
-            if len(current_chunk) + len(sentence) + 1 > self.chunk_size and current_chunk:
-                # Create chunk from current content
-                chunk = TextChunk(
-                    text=current_chunk.strip(),
-                    chunk_index=chunk_index,
-                    total_chunks=0,  # Will be updated later
-                    document_id=document_id,
-                    document_name=document_name,
-                    start_char=current_start,
-                    end_char=current_start + len(current_chunk),
-                    page_number=page_number
-                )
-                chunks.append(chunk)
-                
-                # Start new chunk with overlap
-                overlap_text = self._get_overlap_text(current_chunk)
-                current_chunk = overlap_text + " " + sentence if overlap_text else sentence
-                current_start = current_start + len(current_chunk) - len(overlap_text) - len(sentence) - 1
-                chunk_index += 1
-            else:
-                # Add sentence to current chunk
-                if current_chunk:
-                    current_chunk += " " + sentence
-                else:
-                    current_chunk = sentence
-                    current_start = 0
-        
-        # Add the last chunk if it has content
-        if current_chunk.strip():
-            chunk = TextChunk(
-                text=current_chunk.strip(),
-                chunk_index=chunk_index,
-                total_chunks=0,  # Will be updated
-                document_id=document_id,
-                document_name=document_name,
-                start_char=current_start,
-                end_char=current_start + len(current_chunk),
-                page_number=page_number
-            )
-            chunks.append(chunk)
+        spans, groups = self._group_spans(text, spans)
+        chunks = [
+            self._make_chunk(text, spans, first, last, chunk_index, document_id, document_name, page_number)
+            for chunk_index, (first, last) in enumerate(groups)
+        ]
         
         # Update total_chunks for all chunks
         total_chunks = len(chunks)
@@ -108,33 +119,165 @@ class TextChunker:
         
         return chunks
     
-    def _get_overlap_text(self, text: str) -> str:
-        """Get the last portion of text for overlap."""
-        if len(text) <= self.overlap_size:
-            return text
+    def iter_chunks(self, pieces: Iterable[str], document_id: str, document_name: str) -> Iterator[TextChunk]:
+        """
+        Chunk text that arrives in pieces, yielding chunks as soon as they are final.
         
-        # Find the last sentence that fits in overlap size
-        sentences = self.split_into_sentences(text)
-        overlap_text = ""
+        Yields the same chunks `create_chunks` returns for `"".join(pieces)`,
+        with offsets into that joined text, except that `total_chunks` is 0
+        since the total is unknown until the last piece. Only the sentences
+        of the chunk still being filled are carried over between pieces. In
+        "tokens" mode an over-long sentence that is carried over may be cut
+        at slightly different token boundaries.
+        """
+        buffer = ""
+        offset = 0  # Position of buffer[0] in the joined text
+        chunk_index = 0
+        resume = 1  # First sentence of the buffer the packing has not passed yet
+        # Sentences of the buffer that have ended, and where the open one starts.
+        # Only text added since the last piece is scanned for boundaries, so a
+        # long run without any stays linear.
+        closed: List[Tuple[int, int]] = []
+        open_start = 0
+        for piece in pieces:
+            scanned = len(buffer)
+            buffer += piece
+            # The lookbehind still sees the character before `scanned`
+            for boundary in SENTENCE_BOUNDARY.finditer(buffer, scanned):
+                self._add_span(closed, buffer, open_start, boundary.start())
+                open_start = boundary.end()
+            open_span = []
+            self._add_span(open_span, buffer, open_start, len(buffer))
+            if len(closed) + len(open_span) <= resume:
+                continue
+            # The last sentence may continue in the next piece
+            spans, groups = self._group_spans(buffer, closed if open_span else closed[:-1], resume)
+            for first, last in groups[:-1]:
+                chunk = self._make_chunk(buffer, spans, first, last, chunk_index, document_id, document_name)
+                chunk.start_char += offset
+                chunk.end_char += offset
+                chunk_index += 1
+                yield chunk
+            # The last group can still grow; carry it over from its first sentence
+            # and resume packing after the sentences it has already taken
+            carry = groups[-1][0]
+            resume = len(spans) - carry
+            carry_from = spans[carry][0]
+            buffer = buffer[carry_from:]
+            offset += carry_from
+            # A carried sentence cut at token boundaries restarts at carry_from
+            closed = [(max(start, carry_from) - carry_from, end - carry_from) for start, end in closed if end > carry_from]
+            open_start -= carry_from
         
-        for sentence in reversed(sentences):
-            if len(overlap_text + sentence) <= self.overlap_size:
-                overlap_text = sentence + " " + overlap_text if overlap_text else sentence
-            else:
-                break
+        spans = closed
+        self._add_span(spans, buffer, open_start, len(buffer))
+        if not spans:
+            return
+        spans, groups = self._group_spans(buffer, spans, resume)
+        for first, last in groups:
+            chunk = self._make_chunk(buffer, spans, first, last, chunk_index, document_id, document_name)
+            chunk.start_char += offset
+            chunk.end_char += offset
+            chunk_index += 1
+            yield chunk
+    
+    def _group_spans(self, text: str, spans: List[Tuple[int, int]], resume: int = 1) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+        """Pack sentence spans into chunks; returns the (possibly split) spans and (first, last) groups."""
+        if self.mode == "tokens":
+            spans, counts = self._token_spans(text, spans)
+            # Token cost of sentences first..last is prefix[last + 1] - prefix[first]
+            prefix = [0]
+            for count in counts:
+                prefix.append(prefix[-1] + count)
+            return spans, self._pack(prefix[:-1], prefix[1:], self.token_target, self.token_overlap, resume)
+        return spans, self._pack([start for start, _ in spans], [end for _, end in spans], self.chunk_size, self.overlap_size, resume)
+    
+    @staticmethod
+    def _make_chunk(text: str, spans: List[Tuple[int, int]], first: int, last: int, chunk_index: int, document_id: str, document_name: str, page_number: int = None) -> TextChunk:
+        start_char, end_char = spans[first][0], spans[last][1]
+        return TextChunk(
+            text=text[start_char:end_char],
+            chunk_index=chunk_index,
+            total_chunks=0,  # Filled in once all chunks are known
+            document_id=document_id,
+            document_name=document_name,
+            start_char=start_char,
+            end_char=end_char,
+            page_number=page_number
+        )
+    
+    def _token_spans(self, text: str, spans: List[Tuple[int, int]]) -> Tuple[List[Tuple[int, int]], List[int]]:
+        """
+        Count tokens per sentence with one batched call to the fast tokenizer.
+        
+        Sentences longer than the token target are cut at token boundaries
+        into pieces that fit. Returns the (possibly split) spans and their
+        token counts.
+        """
+        tokenizer = get_tokenizer(self.tokenizer_name)
+        encoded = tokenizer(
+            [text[start:end] for start, end in spans],
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            return_attention_mask=False,
+            return_token_type_ids=False
+        )
+        token_spans, counts = [], []
+        for (start, end), offsets in zip(spans, encoded["offset_mapping"]):
+            if len(offsets) <= self.token_target:
+                token_spans.append((start, end))
+                counts.append(len(offsets))
+                continue
+            for piece in range(0, len(offsets), self.token_target):
+                window = offsets[piece:piece + self.token_target]
+                token_spans.append((start + window[0][0], start + window[-1][1]))
+                counts.append(len(window))
+        return token_spans, counts
+    
+    def _pack(self, starts: List[int], ends: List[int], budget: int, overlap: int, resume: int = 1) -> List[Tuple[int, int]]:
+        """
+        Group consecutive sentences into chunks whose cost is at most `budget`.
         
-        return overlap_text.strip()
+        The cost of sentences first..last is `ends[last] - starts[first]`:
+        character offsets in "chars" mode, token prefix sums in "tokens"
+        mode. Returns (first, last) sentence index pairs. Each new chunk
+        starts with the trailing sentences of the previous one that fit in
+        `overlap`, as far as they leave room for the sentence that opened
+        the chunk. A single sentence over budget becomes its own chunk.
+        Sentences before `resume` are taken into the first chunk unchecked,
+        which lets `iter_chunks` continue an interrupted pack.
+        """
+        groups = []
+        first = 0
+        for k in range(resume, len(starts)):
+            if ends[k] - starts[first] <= budget:
+                continue
+            groups.append((first, k - 1))
+            # Walk back over the sentences that fit in the overlap window
+            overlap_start = k
+            while overlap_start - 1 > first and ends[k - 1] - starts[overlap_start - 1] <= overlap:
+                overlap_start -= 1
+            # Give up overlap until sentence k fits in the new chunk
+            while overlap_start < k and ends[k] - starts[overlap_start] > budget:
+                overlap_start += 1
+            first = overlap_start
+        groups.append((first, len(starts) - 1))
+        return groups
     
     def chunk_by_paragraphs(self, text: str, document_id: str, document_name: str) -> List[TextChunk]:
         """
         Alternative chunking method that respects paragraph boundaries.
         Useful for documents with clear paragraph structure.
         """
-        paragraphs = text.split('\n\n')
         chunks = []
         chunk_index = 0
+        para_start = 0
         
-        for para in paragraphs:
+        for separator in list(re.finditer(r'\n\n', text)) + [None]:
+            para_end = separator.start() if separator else len(text)
+            para = text[para_start:para_end]
+            offset = para_start
+            para_start = separator.end() if separator else len(text)
             if not para.strip():
                 continue
             
@@ -143,17 +286,20 @@ class TextChunker:
                 para_chunks = self.create_chunks(para, document_id, document_name)
                 for chunk in para_chunks:
                     chunk.chunk_index = chunk_index
+                    chunk.start_char += offset
+                    chunk.end_char += offset
                     chunks.append(chunk)
                     chunk_index += 1
             else:
+                leading = len(para) - len(para.lstrip())
                 chunk = TextChunk(
                     text=para.strip(),
                     chunk_index=chunk_index,
                     total_chunks=0,
                     document_id=document_id,
                     document_name=document_name,
-                    start_char=0,
-                    end_char=len(para)
+                    start_char=offset + leading,
+                    end_char=offset + leading + len(para.strip())
                 )
                 chunks.append(chunk)
                 chunk_index += 1
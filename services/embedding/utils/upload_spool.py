@@ -0,0 +1,44 @@
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Tuple
+
+import aiofiles
+from fastapi import HTTPException, UploadFile
+
+async def spool_upload(file: UploadFile, max_bytes: int, chunk_size: int = 1024 * 1024, directory: str = None) -> Tuple[Path, str]:
+    """
+    Stream an upload to a temporary file in fixed-size chunks.
+
+    Only one chunk is held in memory at a time, and the size limit is
+    enforced while the bytes come in. Returns the file and the SHA-256 hex
+    digest of its content, computed on the way. The caller owns the
+    returned file and must delete it when done.
+    """
+    suffix = Path(file.filename or "").suffix.lower()
+    fd, path = tempfile.mkstemp(prefix="upload_", suffix=suffix, dir=directory)
+    os.close(fd)
+    path = Path(path)
+    total = 0
+    digest = hashlib.sha256()
+    try:
+        async with aiofiles.open(path, "wb") as out:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                total += len(chunk)
+                if max_bytes and total > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File too large. Maximum upload size is {max_bytes} bytes"
+                    )
+                digest.update(chunk)
+                await out.write(chunk)
+        if total == 0:
+            raise HTTPException(status_code=400, detail="Empty file")
+        return path, digest.hexdigest()
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
@@ -1,45 +1,381 @@
 from chromadb import PersistentClient
 from sentence_transformers import SentenceTransformer
+import json
+import threading
+import time
 import uuid
+from datetime import datetime
+from typing import Callable, Optional
+import numpy as np
+
+import config
+from models.batcher import EncodeBatcher
+from models.registry import model_registry, model_id
+from utils.query_cache import QueryEmbeddingCache
+from utils.embedding_cache import EmbeddingCache
+from vectordb.lexical_index import BM25Index
+
+COLLECTION_NAME = "walnut-embeddings"
+
+def build_where(document_ids: list[str] = None, file_types: list[str] = None, upload_date_from: datetime = None, upload_date_to: datetime = None) -> Optional[dict]:
+    """
+    Build a Chroma `where` filter from search constraints.
+
+    Upload dates are compared on the numeric `upload_timestamp` chunk
+    metadata, since Chroma range operators only work on numbers.
+    """
+    conditions = []
+    if document_ids:
+        conditions.append({"document_id": {"$in": list(document_ids)}})
+    if file_types:
+        conditions.append({"file_type": {"$in": [file_type.lower().lstrip(".") for file_type in file_types]}})
+    if upload_date_from:
+        conditions.append({"upload_timestamp": {"$gte": upload_date_from.timestamp()}})
+    if upload_date_to:
+        conditions.append({"upload_timestamp": {"$lte": upload_date_to.timestamp()}})
+
+    if not conditions:
+        return None
+    if len(conditions) == 1:
+        return conditions[0]
+    return {"$and": conditions}
 
 class ChromaStore:
-    def __init__(self, db_path="./chromadb"):
+    def __init__(self, db_path=config.CHROMA_DB_PATH, max_batch_size=config.ENCODE_MAX_BATCH_SIZE, max_wait_ms=config.ENCODE_MAX_WAIT_MS):
         # Ensure the directory exists
         import os
         os.makedirs(db_path, exist_ok=True)
         
         self.client = PersistentClient(path=db_path)
-        self.embedder = SentenceTransformer("BAAI/bge-base-en-v1.5", trust_remote_code=True)
+        self.model_name = config.EMBEDDING_MODEL
+        self.backend = config.EMBEDDING_BACKEND
+        # Cache key: vectors from different backends are not interchangeable
+        self.model_id = model_id(self.model_name, self.backend)
+        # Shared scheduler so concurrent requests share batched forward passes
+        self.batcher = EncodeBatcher(lambda texts: self.embedder.encode(texts), max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+        self.query_cache = QueryEmbeddingCache(
+            max_size=config.QUERY_CACHE_SIZE,
+            ttl_seconds=config.QUERY_CACHE_TTL_SECONDS
+        )
+        self.embedding_cache = EmbeddingCache(
+            db_file=config.EMBEDDING_CACHE_PATH,
+            max_bytes=config.EMBEDDING_CACHE_MAX_BYTES
+        )
         
-        # Get the embedding dimension from the model
-        embedding_dimension = self.embedder.get_sentence_embedding_dimension()
-        print(f"BGE model embedding dimension: {embedding_dimension}")
+        # The model is only loaded when something is embedded; until then the
+        # dimension comes from the collection metadata, if it can be trusted
+        self._embedding_dimension: Optional[int] = None
+        self._stored_dimension: Optional[int] = None
+        self._dimension_lock = threading.Lock()
         
-        # Force delete existing collection to avoid dimension conflicts
+        # Lexical (BM25) index kept in step with the collection for hybrid search
+        self.lexical_index = BM25Index(index_file=config.LEXICAL_INDEX_PATH)
+        # Called after the collection is reset, to drop state that refers to its items
+        self._reset_listeners: list[Callable[[], None]] = []
+        
+        # Reopen the existing collection; it is rebuilt on first use if the dimension changed
+        self.collection = self._open_collection()
+        
+        # Warm the model up in the background; /ready reports when it is done
+        self.ready = threading.Event()
+        threading.Thread(target=self._background_startup, name="store-startup", daemon=True).start()
+
+    def _background_startup(self):
+        self.sync_lexical_index()
+        if config.EMBEDDING_WARM_UP:
+            self.warm_up()
+        else:
+            self.ready.set()
+
+    @property
+    def embedder(self) -> SentenceTransformer:
+        # Shared, lazily loaded instance from the process-wide registry
+        return model_registry.get(self.model_name, self.backend)
+
+    def _collection_metadata(self) -> dict:
+        metadata = {"hnsw:space": "cosine", "embedding_model": self.model_id}
+        if self._embedding_dimension is not None:
+            metadata["embedding_dimension"] = self._embedding_dimension
+        return metadata
+
+    def _open_collection(self):
         try:
-            self.client.delete_collection("walnut-embeddings")
-            print("Deleted existing collection to avoid dimension conflicts")
-        except:
+            collection = self.client.get_collection(COLLECTION_NAME)
+        except Exception:
+            # The dimension is recorded once the model has been loaded
+            collection = self.client.create_collection(name=COLLECTION_NAME, metadata=self._collection_metadata())
+            print("Created collection")
+            return collection
+
+        stored_metadata = collection.metadata or {}
+        stored_dimension = stored_metadata.get("embedding_dimension")
+        if stored_dimension is not None and stored_metadata.get("embedding_model") == self.model_id:
+            # Written for this same model, so it is what the model produces
+            self._embedding_dimension = stored_dimension
+        elif stored_dimension is None:
+            # Collections created before the dimension was recorded: look at a stored vector
+            sample = collection.get(limit=1, include=["embeddings"])
+            embeddings = sample.get("embeddings")
+            if embeddings is not None and len(embeddings):
+                stored_dimension = len(embeddings[0])
+        self._stored_dimension = stored_dimension
+
+        print(f"Opened existing collection with {collection.count()} items (dimension: {stored_dimension or 'unknown'})")
+        return collection
+
+    @property
+    def embedding_dimension(self) -> int:
+        """Dimension of the model's vectors; loads the model if it was not recorded for it."""
+        self._check_dimension()
+        return self._embedding_dimension
+
+    def _check_dimension(self):
+        """
+        Make sure the collection holds vectors of the model's dimension.
+
+        Runs before the first embedding. If the collection was written by a
+        model with another dimension it is reset, which also notifies the
+        reset listeners so document metadata pointing at it is dropped.
+        """
+        if self._embedding_dimension is not None:
+            return
+        with self._dimension_lock:
+            if self._embedding_dimension is not None:
+                return
+            dimension = self.embedder.get_sentence_embedding_dimension()
+            print(f"Embedding model dimension: {dimension}")
+            self._embedding_dimension = dimension
+            if self._stored_dimension is not None and self._stored_dimension != dimension:
+                print(f"Embedding dimension changed ({self._stored_dimension} -> {dimension}), rebuilding collection")
+                self.reset_collection()
+            else:
+                # The distance function cannot be modified, so leave hnsw settings out
+                self.collection.modify(metadata={
+                    **{key: value for key, value in (self.collection.metadata or {}).items() if not key.startswith("hnsw:")},
+                    "embedding_model": self.model_id,
+                    "embedding_dimension": dimension
+                })
+            self._stored_dimension = dimension
+
+    def on_reset(self, listener: Callable[[], None]):
+        """Register a callback run whenever the collection is reset."""
+        self._reset_listeners.append(listener)
+
+    def reset_collection(self):
+        """Delete and recreate the collection, dropping all vectors."""
+        try:
+            self.client.delete_collection(COLLECTION_NAME)
+        except Exception:
             pass  # Collection doesn't exist, which is fine
-        
-        # Create collection with correct embedding dimension
-        self.collection = self.client.get_or_create_collection(
-            name="walnut-embeddings",
-            metadata={"hnsw:space": "cosine"}
-        )
-        print(f"Created collection with dimension: {embedding_dimension}")
+        self.collection = self.client.create_collection(name=COLLECTION_NAME, metadata=self._collection_metadata())
+        self.lexical_index.clear()
+        self.lexical_index.save()
+        for listener in self._reset_listeners:
+            listener()
+        return self.collection
+
+    def sync_lexical_index(self):
+        """Rebuild the lexical index from the collection if it is missing or out of date."""
+        try:
+            count = self.collection.count()
+            if len(self.lexical_index) != count:
+                print(f"Rebuilding lexical index ({len(self.lexical_index)} indexed, {count} in collection)")
+                self.lexical_index.rebuild(self.collection)
+        except Exception as e:
+            print(f"⚠️  Error rebuilding lexical index: {e}")
 
-    def add_texts(self, texts: list[str], metadatas: list[dict] = None) -> list[str]:
-        embeddings = self.embedder.encode(texts).tolist()
-        ids = [str(uuid.uuid4()) for _ in texts]
-        self.collection.add(
+    def warm_up(self, batch_size: int = 16):
+        """Run a dummy batch through the model so the first real request is not slow."""
+        try:
+            start = time.time()
+            self._check_dimension()
+            self.batcher.encode(["warm up the embedding model"] * batch_size)
+            print(f"Embedding model warmed up in {time.time() - start:.2f}s")
+            self.ready.set()
+        except Exception as e:
+            print(f"⚠️  Error warming up embedding model: {e}")
+
+    def embed_texts(self, texts: list[str]) -> np.ndarray:
+        """Embed texts for ingestion, only encoding those missing from the disk cache."""
+        self._check_dimension()
+        cached = self.embedding_cache.get_many(self.model_id, texts)
+        misses = [i for i in range(len(texts)) if i not in cached]
+        if not misses:
+            return np.stack([cached[i] for i in range(len(texts))])
+
+        miss_texts = [texts[i] for i in misses]
+        encoded = np.asarray(self.batcher.encode(miss_texts), dtype=np.float32)
+        self.embedding_cache.put_many(self.model_id, miss_texts, encoded)
+        if not cached:
+            return encoded
+
+        embeddings = np.empty((len(texts), encoded.shape[1]), dtype=np.float32)
+        for i, vector in cached.items():
+            embeddings[i] = vector
+        embeddings[misses] = encoded
+        return embeddings
+
+    @property
+    def max_batch_size(self) -> int:
+        """Largest number of items Chroma accepts in a single call."""
+        try:
+            return self.client.get_max_batch_size()
+        except Exception:
+            return 5000
+
+    def add_texts(self, texts: list[str], metadatas: list[dict] = None, ids: list[str] = None) -> list[str]:
+        """
+        Embed and store texts.
+
+        Callers may supply their own (deterministic) ids; those are upserted
+        so storing the same chunk twice is idempotent. Without ids, random
+        uuids are assigned.
+        """
+        return self.add_embeddings(texts, self.embed_texts(texts), metadatas, ids)
+
+    def add_embeddings(self, texts: list[str], embeddings: np.ndarray, metadatas: list[dict] = None, ids: list[str] = None) -> list[str]:
+        """Store texts whose embeddings were already computed; same id handling as `add_texts`."""
+        embeddings = embeddings.tolist()
+        metadatas = metadatas if metadatas else [{} for _ in texts]
+        if ids is None:
+            ids = [str(uuid.uuid4()) for _ in texts]
+            write = self.collection.add
+        else:
+            write = self.collection.upsert
+        write(
             ids=ids,
             documents=texts,
             embeddings=embeddings,
-            metadatas=metadatas if metadatas else [{} for _ in texts]
+            metadatas=metadatas
         )
+        self.lexical_index.add(ids, texts)
+        self.lexical_index.maybe_save()
         return ids
 
-    def search(self, query: str, k: int = 5):
-        embedding = self.embedder.encode([query]).tolist()[0]
-        return self.collection.query(query_embeddings=[embedding], n_results=k)
\ No newline at end of file
+    def get_ids(self, ids: list[str], include: list[str] = None) -> dict:
+        """Fetch items by id in batches; a direct primary-key lookup with no metadata scan."""
+        include = ["documents", "metadatas"] if include is None else include
+        merged = {"ids": [], "documents": [], "metadatas": []}
+        for start in range(0, len(ids), self.max_batch_size):
+            page = self.collection.get(ids=ids[start:start + self.max_batch_size], include=include)
+            merged["ids"].extend(page["ids"])
+            for field in ("documents", "metadatas"):
+                if page.get(field) is not None:
+                    merged[field].extend(page[field])
+        return merged
+
+    def delete_ids(self, ids: list[str]):
+        """Delete items from the collection and the lexical index."""
+        for start in range(0, len(ids), self.max_batch_size):
+            self.collection.delete(ids=ids[start:start + self.max_batch_size])
+        self.lexical_index.remove(ids)
+        self.lexical_index.maybe_save()
+
+    def update_metadata(self, ids: list[str], metadatas: list[dict]):
+        """Set metadata fields of stored items in batches; fields not given are kept."""
+        for start in range(0, len(ids), self.max_batch_size):
+            end = start + self.max_batch_size
+            self.collection.update(ids=ids[start:end], metadatas=metadatas[start:end])
+
+    def delete_where(self, where: dict) -> int:
+        """Delete every item matching a metadata filter; returns how many were deleted."""
+        ids = self.collection.get(where=where, include=[])["ids"]
+        if ids:
+            self.delete_ids(ids)
+        return len(ids)
+
+    def embed_query(self, query: str):
+        """Embed a search query, skipping the model entirely on a cache hit."""
+        self._check_dimension()
+        embedding = self.query_cache.get(self.model_id, query)
+        if embedding is None:
+            embedding = self.batcher.encode([query])[0]
+            self.query_cache.put(self.model_id, query, embedding)
+        return embedding
+
+    def embed_queries(self, queries: list[str]) -> np.ndarray:
+        """Embed several queries with a single forward pass for all cache misses."""
+        self._check_dimension()
+        embeddings = [self.query_cache.get(self.model_id, query) for query in queries]
+        misses = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if misses:
+            encoded = self.batcher.encode([queries[i] for i in misses])
+            for i, embedding in zip(misses, encoded):
+                self.query_cache.put(self.model_id, queries[i], embedding)
+                embeddings[i] = embedding
+        return np.stack(embeddings)
+
+    def search(self, query: str, k: int = 5, where: dict = None):
+        """Top-k vector search; `where` is applied inside the query so filtered top-k stays complete."""
+        embedding = self.embed_query(query).tolist()
+        return self.collection.query(query_embeddings=[embedding], n_results=k, where=where)
+
+    def search_batch(self, queries: list[str], ks: list[int], wheres: list[Optional[dict]]) -> list[dict]:
+        """
+        Run several searches with one encode and as few vector queries as possible.
+
+        Queries sharing the same filter go to Chroma as one multi-embedding
+        query (with the largest k of the group, trimmed per query). Returns
+        one Chroma-style result per query.
+        """
+        embeddings = self.embed_queries(queries).tolist()
+
+        groups: dict[str, list[int]] = {}
+        for i, where in enumerate(wheres):
+            groups.setdefault(json.dumps(where, sort_keys=True), []).append(i)
+
+        results: list[Optional[dict]] = [None] * len(queries)
+        for positions in groups.values():
+            n_results = max(ks[i] for i in positions)
+            response = self.collection.query(
+                query_embeddings=[embeddings[i] for i in positions],
+                n_results=n_results,
+                where=wheres[positions[0]]
+            )
+            for row, i in enumerate(positions):
+                results[i] = {
+                    field: [response[field][row][:ks[i]]]
+                    for field in ("ids", "documents", "metadatas", "distances")
+                    if response.get(field) is not None
+                }
+        return results
+
+    def hybrid_search(self, query: str, k: int = 5, where: dict = None, mode: str = "hybrid", rrf_k: int = 60):
+        """
+        Lexical or hybrid search, returned in the same shape as `search`.
+
+        In hybrid mode the BM25 and vector rankings are fused with reciprocal
+        rank fusion: score = sum(1 / (rrf_k + rank)). Lexical hits are checked
+        against `where` when their documents are fetched.
+        """
+        fetch = max(k * 4, 20)
+        fused: dict[str, float] = {}
+        found: dict[str, tuple] = {}
+
+        if mode == "hybrid":
+            vector = self.search(query, fetch, where=where)
+            for rank, (chunk_id, document, metadata, distance) in enumerate(zip(
+                vector["ids"][0], vector["documents"][0], vector["metadatas"][0], vector["distances"][0]
+            )):
+                fused[chunk_id] = fused.get(chunk_id, 0.0) + 1.0 / (rrf_k + rank + 1)
+                found[chunk_id] = (document, metadata, distance)
+
+        # Filtered-out lexical hits are dropped below, so over-fetch when filtering
+        lexical = self.lexical_index.search(query, fetch * 4 if where else fetch)
+        for rank, (chunk_id, _) in enumerate(lexical):
+            fused[chunk_id] = fused.get(chunk_id, 0.0) + 1.0 / (rrf_k + rank + 1)
+
+        missing = [chunk_id for chunk_id in fused if chunk_id not in found]
+        if missing:
+            page = self.collection.get(ids=missing, where=where, include=["documents", "metadatas"])
+            for chunk_id, document, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+                found[chunk_id] = (document, metadata, None)
+
+        ranked = sorted((chunk_id for chunk_id in fused if chunk_id in found), key=lambda chunk_id: -fused[chunk_id])[:k]
+        return {
+            "ids": [ranked],
+            "documents": [[found[chunk_id][0] for chunk_id in ranked]],
+            "metadatas": [[found[chunk_id][1] for chunk_id in ranked]],
+            "distances": [[found[chunk_id][2] for chunk_id in ranked]],
+            "scores": [[fused[chunk_id] for chunk_id in ranked]],
+        }
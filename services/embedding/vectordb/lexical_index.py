@@ -0,0 +1,267 @@
+import math
+import os
+import pickle
+import re
+import threading
+import time
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9_]+")
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens; keeps syscall names, acronyms and numbers intact."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+class BM25Index:
+    """
+    Incremental in-process inverted index over chunk text, scored with BM25.
+
+    Every chunk gets an integer slot. Postings are compact typed arrays of
+    (slot, term frequency) per term, so scoring a query is a few vectorized
+    numpy operations over the posting lists of its terms. Deleted chunks are
+    tombstoned and the postings are compacted once enough of them pile up.
+    The index is pickled to disk at most every `save_interval` seconds.
+    """
+
+    VERSION = 1
+
+    # Attributes holding the indexed data, swapped in as a whole by `rebuild`
+    STATE = ("_terms", "_posting_slots", "_posting_tfs", "_ids", "_slot_of", "_doc_len", "_alive", "_total_len", "_deleted")
+
+    def __init__(self, index_file="./lexical_index.pkl", k1: float = 1.5, b: float = 0.75, save_interval: float = 30.0, load: bool = True):
+        self.index_file = Path(index_file)
+        self.k1 = k1
+        self.b = b
+        self.save_interval = save_interval
+        self._lock = threading.RLock()
+        # Serializes writers of the index file
+        self._save_lock = threading.Lock()
+        # Changes made while `rebuild` runs, replayed onto the rebuilt index
+        self._journal: Optional[list] = None
+        self._reset()
+        self._last_save = time.monotonic()
+        if load:
+            self.load()
+
+    def _reset(self):
+        self._terms: dict[str, int] = {}
+        self._posting_slots: list[array] = []
+        self._posting_tfs: list[array] = []
+        self._ids: list[Optional[str]] = []
+        self._slot_of: dict[str, int] = {}
+        self._doc_len = array("I")
+        self._alive = bytearray()
+        self._total_len = 0
+        self._deleted = 0
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def add(self, ids: Iterable[str], texts: Iterable[str]):
+        """Index chunks; re-adding an existing id replaces its entry."""
+        with self._lock:
+            if self._journal is not None:
+                ids, texts = list(ids), list(texts)
+                self._journal.append(("add", ids, texts))
+            for chunk_id, text in zip(ids, texts):
+                if chunk_id in self._slot_of:
+                    self._remove_one(chunk_id)
+                tokens = tokenize(text or "")
+                slot = len(self._ids)
+                for term, tf in Counter(tokens).items():
+                    term_id = self._terms.get(term)
+                    if term_id is None:
+                        term_id = self._terms[term] = len(self._posting_slots)
+                        self._posting_slots.append(array("I"))
+                        self._posting_tfs.append(array("H"))
+                    self._posting_slots[term_id].append(slot)
+                    self._posting_tfs[term_id].append(min(tf, 65535))
+                self._ids.append(chunk_id)
+                self._slot_of[chunk_id] = slot
+                self._doc_len.append(len(tokens))
+                self._alive.append(1)
+                self._total_len += len(tokens)
+            self._dirty = True
+
+    def remove(self, ids: Iterable[str]):
+        """Remove chunks by id; unknown ids are ignored."""
+        with self._lock:
+            if self._journal is not None:
+                ids = list(ids)
+                self._journal.append(("remove", ids, None))
+            for chunk_id in ids:
+                if chunk_id in self._slot_of:
+                    self._remove_one(chunk_id)
+                    self._dirty = True
+            if self._deleted > max(1000, len(self._ids) // 4):
+                self.compact()
+
+    def _remove_one(self, chunk_id: str):
+        slot = self._slot_of.pop(chunk_id)
+        self._ids[slot] = None
+        self._alive[slot] = 0
+        self._total_len -= self._doc_len[slot]
+        self._doc_len[slot] = 0
+        self._deleted += 1
+
+    def clear(self):
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append(("clear", None, None))
+            self._reset()
+            self._dirty = True
+
+    def compact(self):
+        """Drop tombstoned slots and renumber the remaining ones."""
+        with self._lock:
+            if not self._deleted:
+                return
+            alive = np.frombuffer(self._alive, dtype=np.uint8).astype(bool)
+            remap = np.full(len(self._ids), -1, dtype=np.int64)
+            remap[alive] = np.arange(int(alive.sum()))
+
+            terms, posting_slots, posting_tfs = {}, [], []
+            for term, term_id in self._terms.items():
+                slots = remap[np.frombuffer(self._posting_slots[term_id], dtype=np.uint32)]
+                keep = slots >= 0
+                if not keep.any():
+                    continue
+                terms[term] = len(posting_slots)
+                posting_slots.append(array("I", slots[keep].astype(np.uint32).tobytes()))
+                posting_tfs.append(array("H", np.frombuffer(self._posting_tfs[term_id], dtype=np.uint16)[keep].tobytes()))
+
+            doc_len = np.frombuffer(self._doc_len, dtype=np.uint32)[alive]
+            self._ids = [chunk_id for chunk_id in self._ids if chunk_id is not None]
+            self._slot_of = {chunk_id: slot for slot, chunk_id in enumerate(self._ids)}
+            self._terms, self._posting_slots, self._posting_tfs = terms, posting_slots, posting_tfs
+            self._doc_len = array("I", doc_len.tobytes())
+            self._alive = bytearray(b"\x01" * len(self._ids))
+            self._deleted = 0
+            self._dirty = True
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Return up to k (chunk id, BM25 score) pairs, best first."""
+        with self._lock:
+            live = len(self._slot_of)
+            term_ids = {self._terms[term] for term in tokenize(query) if term in self._terms}
+            if not live or not term_ids:
+                return []
+
+            avg_len = self._total_len / live or 1.0
+            doc_len = np.frombuffer(self._doc_len, dtype=np.uint32)
+            scores = np.zeros(len(self._ids), dtype=np.float32)
+            for term_id in term_ids:
+                slots = np.frombuffer(self._posting_slots[term_id], dtype=np.uint32)
+                tfs = np.frombuffer(self._posting_tfs[term_id], dtype=np.uint16).astype(np.float32)
+                # Document frequency includes tombstones until the next compaction
+                df = min(len(slots), live)
+                idf = math.log(1.0 + (live - df + 0.5) / (df + 0.5))
+                norm = self.k1 * (1.0 - self.b + self.b * doc_len[slots] / avg_len)
+                scores[slots] += idf * tfs * (self.k1 + 1.0) / (tfs + norm)
+            scores *= np.frombuffer(self._alive, dtype=np.uint8)
+
+            candidates = np.flatnonzero(scores)
+            if len(candidates) > k:
+                candidates = candidates[np.argpartition(scores[candidates], -k)[-k:]]
+            candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+            return [(self._ids[slot], float(scores[slot])) for slot in candidates]
+
+    def rebuild(self, collection, batch_size: int = 5000):
+        """
+        Rebuild the index from every document stored in a Chroma collection.
+
+        The new index is built aside while searches keep using the current
+        one. Changes made in the meantime are journaled and replayed onto
+        the new index before it is swapped in.
+        """
+        with self._lock:
+            self._journal = []
+        try:
+            rebuilt = BM25Index(self.index_file, self.k1, self.b, load=False)
+            offset = 0
+            while True:
+                page = collection.get(limit=batch_size, offset=offset, include=["documents"])
+                ids = page.get("ids") or []
+                if not ids:
+                    break
+                rebuilt.add(ids, page.get("documents") or [""] * len(ids))
+                offset += len(ids)
+            with self._lock:
+                for operation, ids, texts in self._journal:
+                    if operation == "add":
+                        rebuilt.add(ids, texts)
+                    elif operation == "remove":
+                        rebuilt.remove(ids)
+                    else:
+                        rebuilt.clear()
+                for name in self.STATE:
+                    setattr(self, name, getattr(rebuilt, name))
+                self._dirty = True
+        finally:
+            with self._lock:
+                self._journal = None
+        self.save()
+
+    def load(self):
+        """Load the index from disk if a compatible file exists."""
+        try:
+            if not self.index_file.exists():
+                return
+            with open(self.index_file, "rb") as f:
+                state = pickle.load(f)
+            if state.get("version") != self.VERSION:
+                return
+            if not len(state["ids"]) == len(state["doc_len"]) // 4 == len(state["alive"]):
+                print("⚠️  Lexical index file is inconsistent, it will be rebuilt")
+                return
+            with self._lock:
+                self._terms = {term: term_id for term_id, term in enumerate(state["terms"])}
+                self._posting_slots = [array("I", data) for data in state["posting_slots"]]
+                self._posting_tfs = [array("H", data) for data in state["posting_tfs"]]
+                self._ids = state["ids"]
+                self._slot_of = {chunk_id: slot for slot, chunk_id in enumerate(self._ids) if chunk_id is not None}
+                self._doc_len = array("I", state["doc_len"])
+                self._alive = bytearray(state["alive"])
+                self._total_len = state["total_len"]
+                self._deleted = len(self._ids) - len(self._slot_of)
+                self._dirty = False
+            print(f"📚 Loaded lexical index with {len(self)} chunks")
+        except Exception as e:
+            print(f"⚠️  Error loading lexical index: {e}")
+            self._reset()
+
+    def save(self):
+        """Write the index to disk atomically."""
+        with self._save_lock:
+            with self._lock:
+                # Copy everything under the lock; pickling happens after it is released
+                state = {
+                    "version": self.VERSION,
+                    "terms": list(self._terms),
+                    "posting_slots": [postings.tobytes() for postings in self._posting_slots],
+                    "posting_tfs": [tfs.tobytes() for tfs in self._posting_tfs],
+                    "ids": list(self._ids),
+                    "doc_len": self._doc_len.tobytes(),
+                    "alive": bytes(self._alive),
+                    "total_len": self._total_len,
+                }
+                self._dirty = False
+                self._last_save = time.monotonic()
+            tmp_file = self.index_file.with_suffix(self.index_file.suffix + ".tmp")
+            with open(tmp_file, "wb") as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, self.index_file)
+
+    def maybe_save(self):
+        """Save if there are unsaved changes and the last save is old enough."""
+        if self._dirty and time.monotonic() - self._last_save >= self.save_interval:
+            try:
+                self.save()
+            except Exception as e:
+                print(f"⚠️  Error saving lexical index: {e}")